@@ -0,0 +1,94 @@
+"""Mesure le débit de create_flashcards_bulk en fonction de la taille des lots.
+
+Le client Supabase est simulé : chaque requête d'insertion coûte une latence
+fixe plus un coût par ligne, et les requêtes plus grosses que --max-rows sont
+rejetées comme le ferait PostgREST derrière une limite de taille de requête.
+
+    python benchmarks/bulk_insert.py --cards 5000 --chunk-sizes 50 100 250 500 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from config import get_settings
+from models.flashcard import FlashcardCreate
+from services.flashcard_service import create_flashcards_bulk
+
+
+class PayloadTooLarge(Exception):
+    code = "413"
+
+
+class FakeInsert:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+
+    async def execute(self):
+        await asyncio.sleep(self.client.latency + self.client.row_cost * len(self.rows))
+        if len(self.rows) > self.client.max_rows:
+            raise PayloadTooLarge("Requête trop volumineuse")
+        now = datetime.now(timezone.utc).isoformat()
+        return SimpleNamespace(data=[{**row, "id": str(uuid.uuid4()), "created_at": now} for row in self.rows])
+
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def insert(self, rows):
+        return FakeInsert(self.client, rows)
+
+
+class FakeClient:
+    def __init__(self, latency: float, row_cost: float, max_rows: int):
+        self.latency = latency
+        self.row_cost = row_cost
+        self.max_rows = max_rows
+
+    def table(self, name: str):
+        return FakeTable(self)
+
+
+async def run(cards: int, client: FakeClient) -> float:
+    flashcards = [FlashcardCreate(question=f"Q{i}", answer=f"R{i}") for i in range(cards)]
+    start = time.perf_counter()
+    batch = await create_flashcards_bulk(flashcards, "bench", client)
+    elapsed = time.perf_counter() - start
+    assert batch.count == cards, f"{len(batch.failed)} flashcards en échec"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[50, 100, 250, 500, 1000])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="latence fixe par requête (s)")
+    parser.add_argument("--row-cost", type=float, default=0.0002, help="coût par ligne insérée (s)")
+    parser.add_argument("--max-rows", type=int, default=1000, help="lignes maximales par requête")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    settings.batch_insert_concurrency = args.concurrency
+    client = FakeClient(args.latency, args.row_cost, args.max_rows)
+
+    print(f"{args.cards} flashcards, concurrence {args.concurrency}")
+    for chunk_size in args.chunk_sizes:
+        settings.batch_insert_chunk_size = chunk_size
+        elapsed = asyncio.run(run(args.cards, client))
+        print(f"  lots de {chunk_size:>5} : {elapsed:6.2f}s  {args.cards / elapsed:8.0f} flashcards/s")
+
+
+if __name__ == "__main__":
+    main()
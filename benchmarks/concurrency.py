@@ -0,0 +1,91 @@
+"""Vérifie que N requêtes lentes en parallèle se terminent en ~le temps d'une seule.
+
+Le client Supabase est remplacé par un faux client asynchrone dont chaque
+appel PostgREST dure --latency secondes. Si le chemin de données bloquait la
+boucle d'événements, la durée totale serait proche de N x latence.
+
+    python benchmarks/concurrency.py --requests 200 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+import httpx
+from main import app
+from middlewares.authentication import get_current_user
+from services.supabase_client import get_supabase_client
+
+
+class SlowQuery:
+    """Requête PostgREST factice : chaque méthode de filtre renvoie self."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    async def execute(self):
+        await asyncio.sleep(self.latency)
+        row = {
+            "id": "1",
+            "user_id": "bench",
+            "question": "Q",
+            "answer": "R",
+            "course_name": None,
+            "tags": [],
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        return SimpleNamespace(data=[row])
+
+
+class SlowClient:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def table(self, name: str):
+        return SlowQuery(self.latency)
+
+
+async def run(requests: int, latency: float) -> float:
+    app.dependency_overrides[get_supabase_client] = lambda: SlowClient(latency)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="bench")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get("/flashcards/") for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    assert all(r.status_code == 200 for r in responses), "réponse inattendue"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    elapsed = asyncio.run(run(args.requests, args.latency))
+    print(f"{args.requests} requêtes x {args.latency:.3f}s de latence -> {elapsed:.3f}s au total")
+
+    # Une exécution sérielle prendrait requests * latency ; on tolère un
+    # facteur 3 sur la durée d'une seule requête pour le coût de l'ASGI.
+    if elapsed > args.latency * 3:
+        print("ÉCHEC : les requêtes semblent sérialisées")
+        sys.exit(1)
+    print("OK : les requêtes s'exécutent en parallèle")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Module google.generativeai factice pour les benchmarks.
+
+install() l'enregistre dans sys.modules avant l'import de l'application :
+les appels Gemini répondent alors localement après une latence configurable,
+en une fois ou en streaming par morceaux.
+"""
+import asyncio
+import json
+import re
+import sys
+import types
+
+LATENCY = 0.5
+STREAM_CHUNKS = 8
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StreamedResponse:
+    def __init__(self, text: str):
+        self._text = text
+
+    async def __aiter__(self):
+        size = max(len(self._text) // STREAM_CHUNKS, 1)
+        for start in range(0, len(self._text), size):
+            await asyncio.sleep(LATENCY / STREAM_CHUNKS)
+            yield _Response(self._text[start:start + size])
+
+
+def _answer(prompt: str) -> str:
+    # Prompt groupé du micro-batching : une section par demande
+    sections = re.findall(r"DEMANDE (\d+) : (\d+) flashcards", prompt)
+    if sections:
+        return json.dumps({
+            index: [{"question": f"Question {index}.{i}", "answer": f"Réponse {i}"} for i in range(int(count))]
+            for index, count in sections
+        })
+
+    match = re.search(r"crée (\d+) flashcards", prompt)
+    if match:
+        return json.dumps([
+            {"question": f"Question {i} sur le cours ?", "answer": f"Réponse {i}."}
+            for i in range(int(match.group(1)))
+        ])
+
+    # Prompt d'OCR
+    return "Chapitre 1\n\nLe contenu extrait de l'image de cours.\n\n" * 20
+
+
+class GenerativeModel:
+    def __init__(self, model_name: str, **kwargs):
+        self.model_name = model_name
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        prompt = contents if isinstance(contents, str) else next(c for c in contents if isinstance(c, str))
+        text = _answer(prompt)
+        if stream:
+            return _StreamedResponse(text)
+        await asyncio.sleep(LATENCY)
+        return _Response(text)
+
+
+def configure(**kwargs) -> None:
+    pass
+
+
+def install(latency: float = LATENCY, stream_chunks: int = STREAM_CHUNKS) -> None:
+    """Remplacer google.generativeai par ce module factice."""
+    global LATENCY, STREAM_CHUNKS
+    LATENCY = latency
+    STREAM_CHUNKS = stream_chunks
+
+    module = sys.modules[__name__]
+    google = sys.modules.get("google") or types.ModuleType("google")
+    google.generativeai = module
+    sys.modules["google"] = google
+    sys.modules["google.generativeai"] = module
@@ -0,0 +1,119 @@
+"""Serveur local imitant PostgREST et Supabase Auth pour les benchmarks.
+
+Seul le sous-ensemble utilisé par Cardify est implémenté : filtres eq/is/in,
+order, limit/offset, insertion et mise à jour avec retour des lignes, et
+GET /auth/v1/user. Chaque requête est retardée de FAKE_SUPABASE_LATENCY
+secondes pour simuler l'aller-retour réseau.
+
+    python benchmarks/fake_supabase.py --port 54321 --latency 0.01
+"""
+import argparse
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+LATENCY = float(os.environ.get("FAKE_SUPABASE_LATENCY", "0.01"))
+TABLES: Dict[str, List[dict]] = {}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _matches(row: dict, column: str, expression: str) -> bool:
+    operator, _, value = expression.partition(".")
+    if operator == "eq":
+        return str(row.get(column)) == value
+    if operator == "is":
+        return row.get(column) is None if value == "null" else True
+    if operator == "in":
+        return str(row.get(column)) in value.strip("()").split(",")
+    if operator == "cs":
+        return set(value.strip("{}").split(",")) <= set(row.get(column) or [])
+    # Les autres opérateurs (or, lt...) ne sont pas nécessaires aux scénarios
+    return True
+
+
+def _filter(rows: List[dict], request: Request) -> List[dict]:
+    reserved = {"select", "order", "limit", "offset", "on_conflict", "or", "columns"}
+    for column, expression in request.query_params.multi_items():
+        if column not in reserved:
+            rows = [row for row in rows if _matches(row, column, expression)]
+    return rows
+
+
+async def table(request: Request):
+    await asyncio.sleep(LATENCY)
+    rows = TABLES.setdefault(request.path_params["table"], [])
+
+    if request.method == "POST":
+        payload = await request.json()
+        created = []
+        for row in payload if isinstance(payload, list) else [payload]:
+            now = _now()
+            created.append({"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, "deleted_at": None, **row})
+        rows.extend(created)
+        return JSONResponse(created, status_code=201)
+
+    selected = _filter(rows, request)
+
+    if request.method == "PATCH":
+        changes = await request.json()
+        for row in selected:
+            row.update(changes, updated_at=_now())
+        return JSONResponse(selected)
+
+    if request.method == "DELETE":
+        TABLES[request.path_params["table"]] = [row for row in rows if row not in selected]
+        return JSONResponse(selected)
+
+    for part in reversed(request.query_params.get("order", "").split(",")):
+        if part:
+            column, _, direction = part.partition(".")
+            selected = sorted(selected, key=lambda row: str(row.get(column)), reverse=direction.startswith("desc"))
+
+    offset = int(request.query_params.get("offset", 0))
+    limit = request.query_params.get("limit")
+    selected = selected[offset:offset + int(limit) if limit else None]
+    return JSONResponse(selected)
+
+
+async def user(request: Request):
+    await asyncio.sleep(LATENCY)
+    return JSONResponse({
+        "id": "00000000-0000-0000-0000-000000000001",
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": "bench@cardify.local",
+        "app_metadata": {},
+        "user_metadata": {},
+        "created_at": _now(),
+    })
+
+
+app = Starlette(routes=[
+    Route("/rest/v1/{table}", table, methods=["GET", "POST", "PATCH", "DELETE"]),
+    Route("/auth/v1/user", user, methods=["GET"]),
+])
+
+
+def main():
+    global LATENCY
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency", type=float, default=LATENCY)
+    args = parser.parse_args()
+    LATENCY = args.latency
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
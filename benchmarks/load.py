@@ -0,0 +1,254 @@
+"""Banc de charge reproductible de l'application complète avec Supabase et Gemini locaux.
+
+L'application de main.py tourne dans ce processus (lifespan compris) ; Supabase
+est remplacé par le serveur de fake_supabase.py lancé dans un sous-processus
+et google.generativeai par fake_genai. Les scénarios sont joués avec une
+concurrence fixe et le rapport JSON (débit, p50/p95/p99, erreurs, pic de RSS)
+est écrit dans --output pour comparer deux révisions.
+
+    python benchmarks/load.py --scenario all --requests 500 --concurrency 50
+    python benchmarks/load.py --scenario auth_listing --remote-auth --output before.json
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fake_genai
+import httpx
+import jwt
+
+JWT_SECRET = "benchmark-jwt-secret-at-least-32-bytes-long"
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def _token(role: str, sub: str = USER_ID) -> str:
+    claims = {"sub": sub, "role": role, "aud": "authenticated", "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, JWT_SECRET, algorithm="HS256")
+
+
+def _sample_image() -> str:
+    """Page de cours A4 à 150 dpi, encodée en base64 comme l'enverrait le client."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(image)
+    for line in range(60):
+        draw.text((80, 80 + line * 26), f"Ligne {line} du cours de benchmark", fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def _cards(count: int, offset: int = 0) -> List[dict]:
+    return [
+        {"question": f"Question {offset + i} ?", "answer": f"Réponse {offset + i}.", "course_name": "Benchmark", "tags": ["bench"]}
+        for i in range(count)
+    ]
+
+
+def build_scenarios(args) -> Dict[str, Scenario]:
+    image = _sample_image()
+
+    async def auth_listing(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/flashcards/", params={"limit": 50})
+
+    async def batch_insert(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/flashcards/batch", json=_cards(args.batch_size, i * args.batch_size))
+
+    async def image_generation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/ai/generate-from-base64", json={
+            "image_data": [image] * args.images,
+            "count": args.count,
+            "course_name": f"Cours {i}",
+        })
+
+    async def image_generation_stream(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        payload = {"image_data": [image] * args.images, "count": args.count, "course_name": f"Cours {i}"}
+        async with client.stream("POST", "/ai/generate-from-base64/stream", json=payload) as response:
+            await response.aread()
+        return response
+
+    return {
+        "auth_listing": auth_listing,
+        "batch_insert": batch_insert,
+        "image_generation": image_generation,
+        "image_generation_stream": image_generation_stream,
+    }
+
+
+def _percentile(values: List[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, i)
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if not isinstance(status, int) or status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 2),
+            "p95": round(_percentile(latencies, 95) * 1000, 2),
+            "p99": round(_percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2),
+        },
+        "errors": errors,
+        # ru_maxrss est en Ko sous Linux ; c'est un maximum depuis le début du processus
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_fake_supabase(port: int, latency: float) -> subprocess.Popen:
+    process = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, "benchmarks", "fake_supabase.py"),
+        "--port", str(port), "--latency", str(latency),
+    ])
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("le faux serveur Supabase n'a pas démarré")
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnue"
+
+
+async def run(args, port: int) -> dict:
+    from main import app
+
+    scenarios = build_scenarios(args)
+    selected = list(scenarios) if args.scenario == "all" else [args.scenario]
+    headers = {"Authorization": f"Bearer {_token('authenticated')}"}
+    results = {}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as client:
+            # Jeu de données initial pour que la liste renvoie des pages pleines
+            seed = await client.post("/flashcards/batch", json=_cards(args.seed))
+            seed.raise_for_status()
+
+            for name in selected:
+                if args.warmup:
+                    await run_scenario(client, scenarios[name], args.warmup, min(args.warmup, args.concurrency))
+                results[name] = await run_scenario(client, scenarios[name], args.requests, args.concurrency)
+                print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+
+    return {
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "config": {
+            "supabase_latency_s": args.supabase_latency,
+            "gemini_latency_s": args.gemini_latency,
+            "gemini_stream_chunks": args.stream_chunks,
+            "remote_auth": args.remote_auth,
+            "flashcard_cache": not args.no_cache,
+            "ocr_cache": not args.no_ocr_cache,
+            "generation_quota_per_minute": args.quota_per_minute,
+            "batch_size": args.batch_size,
+            "images": args.images,
+            "count": args.count,
+        },
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", default="all", choices=["all", "auth_listing", "batch_insert", "image_generation", "image_generation_stream"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--supabase-latency", type=float, default=0.01)
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--stream-chunks", type=int, default=8)
+    parser.add_argument("--remote-auth", action="store_true", help="vérifier les jetons auprès du faux Supabase Auth plutôt que localement")
+    parser.add_argument("--no-cache", action="store_true", help="désactiver le cache des listes de flashcards")
+    parser.add_argument("--no-ocr-cache", action="store_true", help="refaire l'OCR de chaque image envoyée")
+    parser.add_argument("--quota-per-minute", type=float, default=0, help="quota de générations par utilisateur (0 = illimité, sinon les scénarios mesurent des 429)")
+    parser.add_argument("--seed", type=int, default=200, help="flashcards créées avant les scénarios")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--output", default="benchmark-report.json")
+    args = parser.parse_args()
+
+    port = _free_port()
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["SUPABASE_KEY"] = _token("service_role", sub="benchmark")
+    os.environ["GEMINI_API_KEY"] = "benchmark"
+    os.environ["JOB_STORE_BACKEND"] = "memory"
+    os.environ["OCR_CACHE_BACKEND"] = "none" if args.no_ocr_cache else "memory"
+    # Tous les scénarios jouent le même utilisateur : le quota par défaut le limiterait
+    os.environ["GENERATION_QUOTA_PER_MINUTE"] = str(args.quota_per_minute)
+    if not args.remote_auth:
+        os.environ["SUPABASE_JWT_SECRET"] = JWT_SECRET
+    if args.no_cache:
+        os.environ["FLASHCARD_CACHE_ENABLED"] = "false"
+    fake_genai.install(latency=args.gemini_latency, stream_chunks=args.stream_chunks)
+
+    server = _start_fake_supabase(port, args.supabase_latency)
+    try:
+        report = asyncio.run(run(args, port))
+    finally:
+        server.terminate()
+        server.wait()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Mesure le nombre de flashcards sérialisées par seconde selon le chemin de réponse.
+
+"response_model" reproduit le travail de FastAPI quand un endpoint renvoie des
+modèles avec response_model : dump des modèles, nouvelle validation, dump en
+mode JSON puis json.dumps. "fast" est le rendu de FastJSONResponse (orjson si
+installé) appliqué directement aux modèles déjà validés. "gzip" ajoute la
+compression telle que configurée par défaut.
+
+    python benchmarks/serialization.py --sizes 100 1000 --repeat 200
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from models.flashcard import FlashcardResponse, Language
+from services import serialization
+from services.serialization import FastJSONResponse
+
+adapter = TypeAdapter(List[FlashcardResponse])
+
+
+def make_cards(count: int) -> List[FlashcardResponse]:
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": "00000000-0000-0000-0000-000000000001",
+            "question": f"Quelle est la définition du concept n°{i} vu en cours ?",
+            "answer": f"Le concept n°{i} désigne une notion clé du chapitre, illustrée par un exemple.",
+            "course_name": "Biologie cellulaire",
+            "tags": ["biologie", "chapitre-3"],
+            "language": Language.FRENCH.value,
+            "created_at": (now - timedelta(seconds=i)).isoformat(),
+            "updated_at": now.isoformat(),
+        }
+        for i in range(count)
+    ]
+    return adapter.validate_python(rows)
+
+
+def response_model_path(cards: List[FlashcardResponse]) -> bytes:
+    content = [card.model_dump() for card in cards]
+    validated = adapter.validate_python(content)
+    return json.dumps(
+        adapter.dump_python(validated, mode="json"),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_path(cards: List[FlashcardResponse]) -> bytes:
+    return FastJSONResponse(cards).body
+
+
+def fast_gzip_path(cards: List[FlashcardResponse]) -> bytes:
+    return gzip.compress(FastJSONResponse(cards).body, compresslevel=6)
+
+
+def measure(fn: Callable[[List[FlashcardResponse]], bytes], cards: List[FlashcardResponse], repeat: int) -> float:
+    fn(cards)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(cards)
+    return len(cards) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    backend = "orjson" if serialization.orjson is not None else "json"
+    print(f"Sérialiseur rapide : {backend}")
+    paths = {"response_model": response_model_path, "fast": fast_path, "fast+gzip": fast_gzip_path}
+
+    for size in args.sizes:
+        cards = make_cards(size)
+        raw = len(fast_path(cards))
+        compressed = len(fast_gzip_path(cards))
+        print(f"\n{size} flashcards ({raw} octets, {compressed} compressés en gzip)")
+        baseline = None
+        for name, fn in paths.items():
+            rate = measure(fn, cards, args.repeat)
+            baseline = baseline or rate
+            print(f"  {name:<15} {rate:>12,.0f} cartes/s  x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
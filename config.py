@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     app_name: str = "Cardify API"
@@ -8,6 +9,116 @@ class Settings(BaseSettings):
     supabase_key: str
     gemini_api_key: str
 
+    # Pool de connexions HTTP partagé par le client Supabase du worker
+    supabase_pool_max_connections: int = 100
+    supabase_pool_max_keepalive: int = 20
+    supabase_pool_keepalive_expiry: float = 30.0
+    supabase_timeout: float = 10.0
+
+    # Vérification locale des jetons d'accès Supabase (secret HS256 ou JWKS)
+    supabase_jwt_secret: Optional[str] = None
+    supabase_jwks_url: Optional[str] = None
+    supabase_jwt_audience: str = "authenticated"
+    auth_cache_size: int = 10000
+    auth_cache_ttl: float = 300.0
+    auth_remote_fallback: bool = True
+
+    # Insertion en masse des flashcards par lots concurrents
+    batch_insert_chunk_size: int = 500
+    batch_insert_concurrency: int = 4
+    batch_insert_max_retries: int = 3
+    batch_insert_retry_backoff: float = 0.2
+
+    # Nombre d'IDs par requête de suppression en masse
+    bulk_delete_chunk_size: int = 200
+
+    # Rétention des flashcards supprimées pour la synchronisation différentielle,
+    # à garder égale à celle de purge_flashcard_tombstones()
+    sync_tombstone_retention_days: int = 30
+
+    # Taille des pages lues pour l'export des flashcards
+    export_page_size: int = 500
+
+    # Cache en lecture des listes de flashcards par utilisateur
+    flashcard_cache_enabled: bool = True
+    flashcard_cache_ttl: float = 30.0
+    flashcard_cache_max_users: int = 10000
+    flashcard_cache_max_pages_per_user: int = 32
+
+    # Cache du texte extrait des images : "memory", "sqlite" ou "none"
+    ocr_cache_backend: str = "memory"
+    ocr_cache_ttl: float = 7 * 24 * 3600
+    ocr_cache_max_bytes: int = 64 * 1024 * 1024
+    ocr_cache_path: str = "ocr_cache.sqlite3"
+    ocr_cache_max_entries: int = 100000
+
+    # OCR : "single" (un appel pour toutes les images) ou "parallel" (par groupes)
+    ocr_mode: str = "single"
+    ocr_group_size: int = 1
+    ocr_concurrency: int = 4
+    ocr_max_retries: int = 2
+    ocr_retry_backoff: float = 0.5
+
+    # Taille totale maximale des images d'une requête, en octets
+    max_upload_bytes: int = 50 * 1024 * 1024
+
+    # Prétraitement des images avant l'envoi à Gemini
+    image_preprocessing_enabled: bool = True
+    image_max_dimension: int = 2048
+    image_jpeg_quality: int = 85
+    image_grayscale: bool = False
+    image_preprocess_workers: int = 2
+
+    # Génération par segments pour les longs cours (map-reduce)
+    generation_chunk_tokens: int = 6000
+    generation_concurrency: int = 4
+    generation_overgenerate_ratio: float = 0.2
+
+    # Partage d'une même génération entre demandes identiques simultanées
+    generation_coalescing_enabled: bool = True
+
+    # Micro-batching des petites demandes de génération concurrentes
+    generation_batching_enabled: bool = False
+    generation_batch_window_ms: float = 20.0
+    generation_batch_max_requests: int = 8
+    generation_batch_max_count: int = 10
+    generation_batch_max_chars: int = 4000
+
+    # Import et configuration du SDK Gemini dès le démarrage plutôt qu'au premier appel
+    gemini_eager_init: bool = False
+
+    # Contrôle d'admission des appels Gemini de chaque worker
+    gemini_max_concurrency: int = 16
+    gemini_max_queue: int = 64
+    gemini_queue_timeout: float = 10.0
+    gemini_call_timeout: float = 60.0
+    gemini_max_retries: int = 2
+    gemini_retry_backoff: float = 0.5
+    gemini_breaker_threshold: int = 5
+    gemini_breaker_recovery: float = 30.0
+
+    # Quota de générations par utilisateur et par worker (seau à jetons, 0 = illimité)
+    generation_quota_per_minute: float = 10.0
+    generation_quota_burst: int = 20
+    generation_quota_max_users: int = 10000
+
+    # Génération en streaming : taille des lots insérés au fil de l'eau
+    stream_insert_batch_size: int = 5
+
+    # Jobs de génération asynchrones : stockage "memory" ou "sqlite"
+    job_store_backend: str = "memory"
+    job_store_path: str = "jobs.sqlite3"
+    job_workers: int = 4
+    job_queue_size: int = 100
+    job_ttl: float = 3600.0
+    job_poll_interval: float = 0.5
+
+    # Compression des réponses : brotli si brotli-asgi est installé, sinon gzip
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
     class Config:
         env_file = ".env"
 
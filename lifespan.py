@@ -1,19 +1,32 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-import google.generativeai as genai
 from config import get_settings
-
-settings = get_settings()
+from services.supabase_client import init_supabase_clients, close_supabase_clients
+from services.job_service import start_job_runner, stop_job_runner
+from services.image_service import start_image_pool, stop_image_pool
+from services.gemini_service import init_gemini, close_gemini
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    settings = get_settings()
     # Logique de démarrage
     print("Démarrage de l'application...")
-    # Initialisation de l'API Gemini
-    genai.configure(api_key=settings.gemini_api_key)
+    # SDK Gemini : importé au premier appel, sauf préchargement demandé
+    if settings.gemini_eager_init:
+        init_gemini(settings)
+    # Client Supabase partagé et son pool de connexions
+    await init_supabase_clients(settings)
+    # Pool de processus du prétraitement des images
+    start_image_pool(settings)
+    # Pool de workers des jobs de génération
+    await start_job_runner(settings)
     
     yield
     
     # Logique d'arrêt
     print("Arrêt de l'application...")
-    # Nettoyage des ressources
\ No newline at end of file
+    # Nettoyage des ressources
+    await stop_job_runner()
+    await close_supabase_clients()
+    stop_image_pool()
+    close_gemini()
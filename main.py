@@ -1,13 +1,27 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, flashcards, ai
+from fastapi.middleware.gzip import GZipMiddleware
+from config import get_settings
+from routers import auth, flashcards, ai, reviews
 from lifespan import lifespan
+from middlewares.timing import TimingMiddleware
+from services.metrics import render_metrics
+from services.serialization import FastJSONResponse
+
+# brotli-asgi est facultatif : sans lui, les réponses sont compressées en gzip
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+settings = get_settings()
 
 app = FastAPI(
     title="API Cardify",
     description="API de Cardify",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Middleware CORS
@@ -17,13 +31,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
+# Mesure des requêtes et en-tête Server-Timing
+app.add_middleware(TimingMiddleware)
+
+# Compression des réponses volumineuses (listes, exports)
+if settings.compression_enabled:
+    if BrotliMiddleware is not None:
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=settings.compression_brotli_quality,
+            minimum_size=settings.compression_minimum_size,
+            gzip_fallback=True
+        )
+    else:
+        app.add_middleware(
+            GZipMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            compresslevel=settings.compression_gzip_level
+        )
+
 # Inclusion des routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentification"])
 app.include_router(flashcards.router, prefix="/flashcards", tags=["Flashcards"])
 app.include_router(ai.router, prefix="/ai", tags=["IA"])
+app.include_router(reviews.router, prefix="/reviews", tags=["Révisions"])
 
 @app.get("/")
 async def root():
-    return {"message": "Bienvenue sur l'API de génération de flashcards"}
\ No newline at end of file
+    return {"message": "Bienvenue sur l'API de génération de flashcards"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Exposer les métriques au format Prometheus."""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
\ No newline at end of file
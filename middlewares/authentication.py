@@ -1,18 +1,67 @@
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from supabase import AsyncClient
+from config import get_settings
+from models.user import AuthenticatedUser
 from services.supabase_service import get_user
+from services.supabase_client import get_supabase_auth_client
+from services.metrics import record_cache_lookup
+from services.token_service import (
+    LocalVerificationUnavailable,
+    can_verify_locally,
+    get_token_cache,
+    token_ttl,
+    verify_token_locally
+)
 
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def _verify_remotely(token: str, supabase: AsyncClient):
+    result = await get_user(token, supabase)
+    user = getattr(result, "user", result)
+    if not user:
+        return None
+
+    return AuthenticatedUser(
+        id=str(user.id),
+        email=getattr(user, "email", None),
+        role=getattr(user, "role", None)
+    )
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    supabase: AsyncClient = Depends(get_supabase_auth_client)
+):
+    # get_settings() est mis en cache : l'appeler ici évite à chaque requête
+    # le passage par le pool de threads d'une dépendance synchrone
+    settings = get_settings()
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Non authentifié",
             headers={"WWW-Authenticate": "Bearer"}
         )
-    
-    user = await get_user(credentials.credentials)
+
+    token = credentials.credentials
+    cache = get_token_cache(settings)
+    user = cache.get(token)
+    record_cache_lookup("auth", user is not None)
+
+    if user is None:
+        # Vérification locale de la signature, avec repli optionnel sur Supabase Auth
+        remote = not can_verify_locally(settings)
+        if not remote:
+            try:
+                user = await verify_token_locally(token, settings)
+            except LocalVerificationUnavailable:
+                remote = True
+
+        if remote and settings.auth_remote_fallback:
+            user = await _verify_remotely(token, supabase)
+
+        if user:
+            cache.set(token, user, ttl=token_ttl(token))
+
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
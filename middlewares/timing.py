@@ -0,0 +1,61 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.metrics import REQUEST_LATENCY, start_request_spans
+
+def route_template(scope: Scope) -> str:
+    """Modèle complet de la route, préfixe du router compris (ex. /flashcards/{flashcard_id}).
+
+    Selon la version de FastAPI, la route placée dans le scope peut ne porter
+    que son chemin relatif au router inclus. Le préfixe est alors retrouvé
+    comme la partie du chemin réel qui précède le segment reconnu par la route.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+
+    path_regex = getattr(route, "path_regex", None)
+    path = scope.get("path", "")
+    if path_regex is None or path_regex.match(path):
+        return template
+
+    for index, char in enumerate(path):
+        if char == "/" and index > 0 and path_regex.match(path[index:]):
+            return path[:index] + template
+    return template
+
+class TimingMiddleware:
+    """Mesure chaque requête HTTP et ajoute l'en-tête Server-Timing des étapes mesurées."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        spans = start_request_spans()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                entries = [f"{stage};dur={duration * 1000:.1f}" for stage, duration in spans]
+                entries.append(f"total;dur={(time.perf_counter() - start) * 1000:.1f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(entries).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # Le modèle de route évite une série par identifiant dans l'URL
+            REQUEST_LATENCY.labels(
+                method=scope["method"],
+                route=route_template(scope),
+                status=str(status_code)
+            ).observe(time.perf_counter() - start)
\ No newline at end of file
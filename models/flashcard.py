@@ -17,6 +17,7 @@ class FlashcardCreate(BaseModel):
     answer: str
     course_name: Optional[str] = None
     tags: List[str] = Field(default_factory=list)
+    language: Optional[Language] = None
 
 class FlashcardResponse(BaseModel):
     id: str
@@ -25,11 +26,41 @@ class FlashcardResponse(BaseModel):
     answer: str
     course_name: Optional[str] = None
     tags: List[str] = []
+    language: Optional[Language] = None
     created_at: datetime
+    updated_at: Optional[datetime] = None
+
+class FlashcardSearchResult(FlashcardResponse):
+    rank: float
+
+class FailedFlashcard(BaseModel):
+    index: int
+    error: str
 
 class FlashcardBatch(BaseModel):
     flashcards: List[FlashcardResponse]
     count: int
+    failed: List[FailedFlashcard] = Field(default_factory=list)
+
+class FlashcardImportResult(BaseModel):
+    created: int = 0
+    failed_count: int = 0
+    failed: List[FailedFlashcard] = Field(default_factory=list)
+
+class FlashcardBulkDelete(BaseModel):
+    ids: Optional[List[str]] = None
+    course_name: Optional[str] = None
+    tags: Optional[List[str]] = None
+
+class FlashcardDeleteResult(BaseModel):
+    deleted_ids: List[str]
+    count: int
+
+class FlashcardChanges(BaseModel):
+    flashcards: List[FlashcardResponse]
+    deleted_ids: List[str]
+    next_token: str
+    has_more: bool
 
 class GenerateFlashcardsRequest(BaseModel):
     image_data: List[str]
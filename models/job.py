@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+from models.flashcard import FlashcardBatch
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class JobStage(str, Enum):
+    QUEUED = "queued"
+    OCR = "ocr"
+    GENERATION = "generation"
+    INSERT = "insert"
+    DONE = "done"
+
+class JobResponse(BaseModel):
+    id: str
+    status: JobStatus
+    stage: JobStage
+    progress: float = 0.0
+    result: Optional[FlashcardBatch] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
\ No newline at end of file
@@ -0,0 +1,43 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from models.flashcard import FlashcardResponse
+
+class ReviewGrade(BaseModel):
+    flashcard_id: str
+    grade: int = Field(..., ge=0, le=5, description="Qualité de la réponse selon SM-2 (0 à 5)")
+    reviewed_at: Optional[datetime] = None
+
+    @field_validator("reviewed_at")
+    @classmethod
+    def check_reviewed_at(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Une date sans fuseau est ambiguë et ne se compare pas aux dates UTC du lot
+        if value is None:
+            return value
+        if value.tzinfo is None:
+            raise ValueError("reviewed_at doit préciser son fuseau horaire")
+        value = value.astimezone(timezone.utc)
+        # Tolérance pour le décalage d'horloge des clients
+        if value > datetime.now(timezone.utc) + timedelta(minutes=5):
+            raise ValueError("reviewed_at ne peut pas être dans le futur")
+        return value
+
+class ReviewBatchRequest(BaseModel):
+    reviews: List[ReviewGrade] = Field(..., min_length=1, max_length=500)
+
+class ReviewState(BaseModel):
+    flashcard_id: str
+    due_at: datetime
+    interval_days: float = 0.0
+    ease: float = 2.5
+    repetitions: int = 0
+    lapses: int = 0
+    last_reviewed_at: Optional[datetime] = None
+
+class DueFlashcard(BaseModel):
+    flashcard: FlashcardResponse
+    review: ReviewState
+
+class ReviewBatchResult(BaseModel):
+    reviews: List[ReviewState]
+    not_found: List[str] = Field(default_factory=list)
\ No newline at end of file
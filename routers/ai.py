@@ -1,14 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from typing import List, Optional
-from models.flashcard import FlashcardBatch, Language
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Callable, List, Optional
+from supabase import AsyncClient
+from models.flashcard import FlashcardBatch, FlashcardCreate, Language
 from models.flashcard import GenerateFlashcardsRequest
 from services.flashcard_service import create_flashcards_batch
-from services.gemini_service import generate_flashcards
+from services.gemini_service import generate_flashcards, stream_flashcards
+from services.supabase_client import get_supabase_client
+from services.job_service import JobRunner, JobQueueFull, get_job_runner
+from models.job import JobResponse
+from services.gemini_guard import GeminiUnavailable, QuotaExceeded, get_gemini_guard, get_generation_quota
+from services.metrics import span
+from services.serialization import FastJSONResponse
+from config import get_settings
 import base64
+import json
+import math
 from middlewares.authentication import get_current_user
 
 router = APIRouter()
 
+def _retry_after(seconds: float) -> dict:
+    return {"Retry-After": str(math.ceil(seconds))}
+
+def _unavailable(e: GeminiUnavailable) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers=_retry_after(e.retry_after)
+    )
+
+async def _admit_generation(user = Depends(get_current_user)):
+    """Refuser une génération avant toute lecture d'image si Gemini est indisponible (503)."""
+    # Dépendance asynchrone et réglages lus ici : pas de passage par le pool de threads
+    try:
+        get_gemini_guard(get_settings()).check_available()
+    except GeminiUnavailable as e:
+        raise _unavailable(e)
+    return user
+
+def _take_generation_quota(user_id: str) -> None:
+    """Consommer un jeton du quota de l'utilisateur, une fois la demande validée (429 sinon)."""
+    try:
+        get_generation_quota(get_settings()).consume(user_id)
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers=_retry_after(e.retry_after)
+        )
+
+def _check_upload_size(total: int) -> None:
+    max_bytes = get_settings().max_upload_bytes
+    if total > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Les images dépassent la taille maximale autorisée ({max_bytes} octets)"
+        )
+
+async def _read_uploaded_images(files: List[UploadFile]) -> List[bytes]:
+    """Lire chaque fichier téléchargé une seule fois, en octets, sans passer par le base64."""
+    # Rejet avant lecture lorsque la taille des fichiers est connue
+    _check_upload_size(sum(file.size or 0 for file in files))
+
+    images = []
+    total = 0
+    with span("decode"):
+        for file in files:
+            contents = await file.read()
+            total += len(contents)
+            _check_upload_size(total)
+            images.append(contents)
+    return images
+
+def _decode_base64_images(image_data_list: List[str]) -> List[bytes]:
+    """Décoder une seule fois, à l'entrée de l'API, les images encodées en base64."""
+    # Le base64 occupe 4 octets pour 3 octets décodés
+    _check_upload_size(sum(len(image_data) for image_data in image_data_list) * 3 // 4)
+
+    images = []
+    with span("decode"):
+        for image_data in image_data_list:
+            if image_data.startswith("data:image"):
+                # Extraire le contenu base64 après la virgule
+                image_data = image_data.split(",", 1)[1]
+            try:
+                images.append(base64.b64decode(image_data))
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Image base64 invalide"
+                )
+    return images
+
 @router.post("/generate-from-images", response_model=FlashcardBatch)
 async def generate_from_images(
     files: List[UploadFile] = File(...),
@@ -16,7 +100,8 @@ async def generate_from_images(
     language: Language = Form(Language.FRENCH),
     course_name: Optional[str] = Form(None),
     tags: List[str] = Form([]),
-    user = Depends(get_current_user)
+    user = Depends(_admit_generation),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """Générer des flashcards à partir d'images téléchargées en utilisant l'API Gemini."""
     if count <= 0 or count > 50:
@@ -24,18 +109,14 @@ async def generate_from_images(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Le nombre doit être compris entre 1 et 50"
         )
-    
+
+    images = await _read_uploaded_images(files)
+    _take_generation_quota(user.id)
+
     try:
-        # Conversion des fichiers téléchargés en base64
-        image_data_list = []
-        for file in files:
-            contents = await file.read()
-            base64_image = base64.b64encode(contents).decode("utf-8")
-            image_data_list.append(base64_image)
-        
         # Génération de flashcards avec l'API Gemini
         generated_flashcards = await generate_flashcards(
-            image_data_list=image_data_list,
+            images=images,
             count=count,
             language=language,
             course_name=course_name,
@@ -43,10 +124,12 @@ async def generate_from_images(
         )
         
         # Sauvegarde des flashcards générées dans la base de données
-        created_cards = await create_flashcards_batch(generated_flashcards, user.id)
+        created_cards = await create_flashcards_batch(generated_flashcards, user.id, supabase)
         
-        return FlashcardBatch(flashcards=created_cards, count=len(created_cards))
+        return FastJSONResponse(FlashcardBatch(flashcards=created_cards, count=len(created_cards)))
         
+    except GeminiUnavailable as e:
+        raise _unavailable(e)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -61,7 +144,8 @@ async def generate_from_images(
 @router.post("/generate-from-base64", response_model=FlashcardBatch)
 async def generate_from_base64(
     request_data: GenerateFlashcardsRequest,
-    user = Depends(get_current_user)
+    user = Depends(_admit_generation),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """Générer des flashcards à partir d'images encodées en base64 en utilisant l'API Gemini."""
     if request_data.count <= 0 or request_data.count > 50:
@@ -69,11 +153,14 @@ async def generate_from_base64(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Le nombre doit être compris entre 1 et 50"
         )
-    
+
+    images = _decode_base64_images(request_data.image_data)
+    _take_generation_quota(user.id)
+
     try:
         # Génération de flashcards avec l'API Gemini
         generated_flashcards = await generate_flashcards(
-            image_data_list=request_data.image_data,
+            images=images,
             count=request_data.count,
             language=request_data.language,
             course_name=request_data.course_name,
@@ -81,10 +168,12 @@ async def generate_from_base64(
         )
         
         # Sauvegarde des flashcards générées dans la base de données
-        created_cards = await create_flashcards_batch(generated_flashcards, user.id)
+        created_cards = await create_flashcards_batch(generated_flashcards, user.id, supabase)
         
-        return FlashcardBatch(flashcards=created_cards, count=len(created_cards))
+        return FastJSONResponse(FlashcardBatch(flashcards=created_cards, count=len(created_cards)))
         
+    except GeminiUnavailable as e:
+        raise _unavailable(e)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -94,4 +183,195 @@ async def generate_from_base64(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Une erreur est survenue: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+def _format_event(event: str, data, sse: bool) -> str:
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+
+async def _stream_generation(
+    flashcards: AsyncIterator[FlashcardCreate],
+    user_id: str,
+    supabase: AsyncClient,
+    sse: bool
+) -> AsyncIterator[str]:
+    """Envoyer chaque flashcard dès qu'elle est générée et l'enregistrer par petits lots."""
+    batch_size = get_settings().stream_insert_batch_size
+    pending: List[FlashcardCreate] = []
+    saved = 0
+
+    async def flush():
+        created_cards = await create_flashcards_batch(pending, user_id, supabase)
+        pending.clear()
+        return [card.model_dump(mode="json") for card in created_cards]
+
+    try:
+        async for flashcard in flashcards:
+            yield _format_event("flashcard", flashcard.model_dump(mode="json"), sse)
+            pending.append(flashcard)
+            if len(pending) >= batch_size:
+                created = await flush()
+                saved += len(created)
+                yield _format_event("saved", created, sse)
+
+        if pending:
+            created = await flush()
+            saved += len(created)
+            yield _format_event("saved", created, sse)
+
+        yield _format_event("done", {"count": saved}, sse)
+
+    except Exception as e:
+        # Les en-têtes sont déjà envoyés : l'erreur est transmise comme un événement
+        yield _format_event("error", {"detail": str(e)}, sse)
+
+def _streaming_response(
+    request: Request,
+    events: Callable[[bool], AsyncIterator[str]]
+) -> StreamingResponse:
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    # Content-Encoding explicite : la compression mettrait les événements en tampon
+    return StreamingResponse(events(sse), media_type=media_type, headers={"Content-Encoding": "identity"})
+
+@router.post("/generate-from-images/stream")
+async def generate_from_images_stream(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    count: int = Form(...),
+    language: Language = Form(Language.FRENCH),
+    course_name: Optional[str] = Form(None),
+    tags: List[str] = Form([]),
+    user = Depends(_admit_generation),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """Générer des flashcards à partir d'images téléchargées, renvoyées au fil de l'eau (NDJSON ou SSE)."""
+    if count <= 0 or count > 50:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le nombre doit être compris entre 1 et 50"
+        )
+
+    # Lecture des fichiers avant le début de la réponse, qui les referme
+    images = await _read_uploaded_images(files)
+    _take_generation_quota(user.id)
+
+    def events(sse: bool):
+        flashcards = stream_flashcards(
+            images=images,
+            count=count,
+            language=language,
+            course_name=course_name,
+            tags=tags
+        )
+        return _stream_generation(flashcards, user.id, supabase, sse)
+
+    return _streaming_response(request, events)
+
+@router.post("/generate-from-base64/stream")
+async def generate_from_base64_stream(
+    request: Request,
+    request_data: GenerateFlashcardsRequest,
+    user = Depends(_admit_generation),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """Générer des flashcards à partir d'images en base64, renvoyées au fil de l'eau (NDJSON ou SSE)."""
+    images = _decode_base64_images(request_data.image_data)
+    _take_generation_quota(user.id)
+
+    def events(sse: bool):
+        flashcards = stream_flashcards(
+            images=images,
+            count=request_data.count,
+            language=request_data.language,
+            course_name=request_data.course_name,
+            tags=request_data.tags
+        )
+        return _stream_generation(flashcards, user.id, supabase, sse)
+
+    return _streaming_response(request, events)
+
+async def _submit_job(
+    runner: JobRunner,
+    user_id: str,
+    images: List[bytes],
+    count: int,
+    language: Language,
+    course_name: Optional[str],
+    tags: List[str]
+) -> JobResponse:
+    """Mettre le job en file d'attente ; le jeton de quota est rendu s'il n'a pas pu l'être."""
+    _take_generation_quota(user_id)
+    try:
+        job = await runner.submit(
+            user_id,
+            images=images,
+            count=count,
+            language=language,
+            course_name=course_name,
+            tags=tags
+        )
+    except JobQueueFull as e:
+        get_generation_quota(get_settings()).refund(user_id)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception:
+        get_generation_quota(get_settings()).refund(user_id)
+        raise
+    return JobResponse(**job)
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_generation_job(
+    request_data: GenerateFlashcardsRequest,
+    user = Depends(_admit_generation),
+    runner: JobRunner = Depends(get_job_runner)
+):
+    """Lancer en arrière-plan une génération à partir d'images en base64 et renvoyer l'identifiant du job."""
+    return await _submit_job(
+        runner,
+        user.id,
+        _decode_base64_images(request_data.image_data),
+        request_data.count,
+        request_data.language,
+        request_data.course_name,
+        request_data.tags
+    )
+
+@router.post("/jobs/upload", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_generation_job_from_images(
+    files: List[UploadFile] = File(...),
+    count: int = Form(...),
+    language: Language = Form(Language.FRENCH),
+    course_name: Optional[str] = Form(None),
+    tags: List[str] = Form([]),
+    user = Depends(_admit_generation),
+    runner: JobRunner = Depends(get_job_runner)
+):
+    """Lancer en arrière-plan une génération à partir d'images téléchargées et renvoyer l'identifiant du job."""
+    if count <= 0 or count > 50:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le nombre doit être compris entre 1 et 50"
+        )
+
+    images = await _read_uploaded_images(files)
+    return await _submit_job(runner, user.id, images, count, language, course_name, tags)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_generation_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Attente maximale (s) de la fin du job"),
+    user = Depends(get_current_user),
+    runner: JobRunner = Depends(get_job_runner)
+):
+    """Récupérer l'état d'un job de génération, avec attente optionnelle de sa fin (long-poll)."""
+    job = await runner.get(job_id, wait=wait)
+    if job is None or job["user_id"] != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job non trouvé"
+        )
+    return JobResponse(**job)
\ No newline at end of file
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
+from supabase import AsyncClient
 from models.flashcard import UserSignUp, UserSignIn, GoogleSignIn
 from services.supabase_service import sign_up_user, sign_in_user, sign_in_with_google
+from services.supabase_client import get_supabase_auth_client
 
 router = APIRouter()
 
 @router.post("/signup")
-async def signup(user_data: UserSignUp):
+async def signup(
+    user_data: UserSignUp,
+    supabase: AsyncClient = Depends(get_supabase_auth_client)
+):
     try:
-        result = await sign_up_user(user_data.email, user_data.password)
+        result = await sign_up_user(user_data.email, user_data.password, supabase)
         return {"message": "Utilisateur enregistré avec succès", "user": result.user}
     except HTTPException as e:
         raise e
@@ -18,9 +23,12 @@ async def signup(user_data: UserSignUp):
         )
     
 @router.post("/login")
-async def login(user_data: UserSignIn):
+async def login(
+    user_data: UserSignIn,
+    supabase: AsyncClient = Depends(get_supabase_auth_client)
+):
     try:
-        result = await sign_in_user(user_data.email, user_data.password)
+        result = await sign_in_user(user_data.email, user_data.password, supabase)
         return {
             "access_token": result.session.access_token,
             "user": result.user
@@ -34,9 +42,12 @@ async def login(user_data: UserSignIn):
         )
     
 @router.post("/google")
-async def google_login(data: GoogleSignIn):
+async def google_login(
+    data: GoogleSignIn,
+    supabase: AsyncClient = Depends(get_supabase_auth_client)
+):
     try:
-        result = await sign_in_with_google(data.token)
+        result = await sign_in_with_google(data.token, supabase)
         return {
             "access_token": result.session.access_token,
             "user": result.user
@@ -1,12 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from models.flashcard import FlashcardResponse, FlashcardCreate, FlashcardBatch
+from supabase import AsyncClient
+from models.flashcard import (
+    FlashcardResponse,
+    FlashcardCreate,
+    FlashcardBatch,
+    FlashcardBulkDelete,
+    FlashcardChanges,
+    FlashcardDeleteResult,
+    FlashcardImportResult,
+    FlashcardSearchResult,
+    Language
+)
 from services.flashcard_service import (
     create_flashcard, 
-    create_flashcards_batch, 
-    get_user_flashcards, 
-    delete_flashcard
+    create_flashcards_bulk,
+    get_user_flashcards_page,
+    delete_flashcard,
+    delete_flashcards,
+    encode_cursor,
+    get_flashcard_changes,
+    SyncTokenExpired
 )
+from services.deck_io import EXPORT_FORMATS, export_flashcards, import_flashcards
+from services.search_service import search_user_flashcards
+from services.serialization import FastJSONResponse
+from services.supabase_client import get_supabase_client
 from middlewares.authentication import get_current_user
 
 router = APIRouter()
@@ -14,11 +34,12 @@ router = APIRouter()
 @router.post("/", response_model=FlashcardResponse)
 async def create_new_flashcard(
     flashcard: FlashcardCreate, 
-    user = Depends(get_current_user)
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """Créer une nouvelle flashcard pour l'utilisateur authentifié."""
     try:
-        result = await create_flashcard(flashcard, user.id)
+        result = await create_flashcard(flashcard, user.id, supabase)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -34,12 +55,20 @@ async def create_new_flashcard(
 @router.post("/batch", response_model=FlashcardBatch)
 async def create_flashcards_in_batch(
     flashcards: List[FlashcardCreate],
-    user = Depends(get_current_user)
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
-    """Créer plusieurs flashcards en une seule requête."""
+    """Créer plusieurs flashcards en une seule requête.
+
+    L'insertion se fait par lots : les flashcards rejetées sont listées dans
+    "failed" avec leur position, sans empêcher la création des autres.
+    """
     try:
-        created_cards = await create_flashcards_batch(flashcards, user.id)
-        return FlashcardBatch(flashcards=created_cards, count=len(created_cards))
+        batch = await create_flashcards_bulk(flashcards, user.id, supabase)
+        if batch.failed and batch.count == 0:
+            raise ValueError(f"Échec de création des flashcards: {batch.failed[0].error}")
+        # Flashcards déjà validées à partir des lignes insérées : pas de seconde validation
+        return FastJSONResponse(batch)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,20 +84,158 @@ async def create_flashcards_in_batch(
 async def get_flashcards(
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
     course_name: Optional[str] = None,
     tags: Optional[List[str]] = None,
-    user = Depends(get_current_user)
+    if_none_match: Optional[str] = Header(None),
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
-    """Récupérer les flashcards de l'utilisateur authentifié avec filtrage optionnel."""
+    """Récupérer les flashcards de l'utilisateur authentifié avec filtrage optionnel.
+
+    Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor.
+    Une page inchangée depuis l'ETag fourni dans If-None-Match renvoie 304.
+    """
     try:
-        flashcards = await get_user_flashcards(
-            user.id, 
+        flashcards, etag = await get_user_flashcards_page(
+            user.id,
+            supabase,
             limit=limit, 
             offset=offset,
             course_name=course_name,
-            tags=tags
+            tags=tags,
+            cursor=cursor
+        )
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if len(flashcards) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(flashcards[-1])
+
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return FastJSONResponse(flashcards, headers=headers)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur est survenue: {str(e)}"
+        )
+
+@router.get("/search", response_model=List[FlashcardSearchResult])
+async def search_flashcards(
+    q: str = Query(..., min_length=1),
+    language: Optional[Language] = None,
+    limit: int = Query(20, gt=0, le=100),
+    offset: int = Query(0, ge=0),
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """Rechercher dans les questions et réponses de l'utilisateur, résultats classés par pertinence."""
+    try:
+        results = await search_user_flashcards(user.id, q, supabase, language=language, limit=limit, offset=offset)
+        return FastJSONResponse(results)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur est survenue: {str(e)}"
+        )
+
+@router.get("/changes", response_model=FlashcardChanges)
+async def get_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, gt=0, le=1000),
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """Récupérer les modifications des flashcards depuis un jeton de synchronisation.
+
+    Les clients hors ligne rappellent l'endpoint avec next_token tant que has_more est vrai.
+    Un jeton trop ancien renvoie 410 : le client repart alors sans jeton.
+    """
+    try:
+        changes = await get_flashcard_changes(user.id, supabase, since=since, limit=limit)
+        return FastJSONResponse(changes)
+    except SyncTokenExpired as e:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur est survenue: {str(e)}"
+        )
+
+@router.get("/export")
+async def export_user_flashcards(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    course_name: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None),
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """Exporter toutes les flashcards de l'utilisateur en NDJSON ou CSV, en streaming."""
+    lines = export_flashcards(user.id, supabase, format, course_name=course_name, tags=tags)
+    return StreamingResponse(
+        lines,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="flashcards.{format}"'}
+    )
+
+@router.post("/import", response_model=FlashcardImportResult)
+async def import_user_flashcards(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """Importer des flashcards depuis un corps NDJSON ou CSV lu en streaming.
+
+    Les lignes invalides ou rejetées sont comptées et listées avec leur position.
+    """
+    try:
+        return await import_flashcards(user.id, supabase, request.stream(), format)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le fichier importé doit être encodé en UTF-8"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur est survenue: {str(e)}"
+        )
+
+@router.delete("/", response_model=FlashcardDeleteResult)
+async def remove_flashcards(
+    selection: FlashcardBulkDelete,
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """Supprimer en une requête plusieurs flashcards, par liste d'IDs ou par filtre course_name/tags."""
+    try:
+        deleted_ids = await delete_flashcards(
+            user.id,
+            supabase,
+            ids=selection.ids,
+            course_name=selection.course_name,
+            tags=selection.tags
+        )
+        return FlashcardDeleteResult(deleted_ids=deleted_ids, count=len(deleted_ids))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        return flashcards
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -78,11 +245,12 @@ async def get_flashcards(
 @router.delete("/{flashcard_id}")
 async def remove_flashcard(
     flashcard_id: str,
-    user = Depends(get_current_user)
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     """Supprimer une flashcard par ID si elle appartient à l'utilisateur authentifié."""
     try:
-        await delete_flashcard(flashcard_id, user.id)
+        await delete_flashcard(flashcard_id, user.id, supabase)
         return {"message": "Flashcard supprimée avec succès"}
     except ValueError as e:
         raise HTTPException(
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List
+from supabase import AsyncClient
+from models.review import DueFlashcard, ReviewBatchRequest, ReviewBatchResult
+from services.review_service import apply_reviews, get_due_flashcards
+from services.supabase_client import get_supabase_client
+from middlewares.authentication import get_current_user
+
+router = APIRouter()
+
+@router.get("/due", response_model=List[DueFlashcard])
+async def get_due(
+    limit: int = Query(20, gt=0, le=200),
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """Récupérer les prochaines flashcards à réviser pour l'utilisateur authentifié."""
+    try:
+        return await get_due_flashcards(user.id, supabase, limit=limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur est survenue: {str(e)}"
+        )
+
+@router.post("/", response_model=ReviewBatchResult)
+async def submit_reviews(
+    batch: ReviewBatchRequest,
+    user = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """Enregistrer plusieurs notes de révision en une seule requête."""
+    try:
+        return await apply_reviews(user.id, batch.reviews, supabase)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur est survenue: {str(e)}"
+        )
\ No newline at end of file
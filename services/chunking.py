@@ -0,0 +1,76 @@
+import re
+from typing import Dict, List
+
+# Approximation courante pour les modèles Gemini : ~4 caractères par jeton
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """Découper un texte en segments d'au plus max_tokens jetons, sur les paragraphes si possible."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text]
+
+    # Un paragraphe trop long est redécoupé par lignes, puis coupé net en dernier recours
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for line in paragraph.splitlines():
+            for start in range(0, len(line), max_chars):
+                pieces.append(line[start:start + max_chars])
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if not piece.strip():
+            continue
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+def distribute_count(count: int, chunks: List[str]) -> List[int]:
+    """Répartir count flashcards entre les segments, proportionnellement à leur longueur."""
+    total = sum(len(chunk) for chunk in chunks) or 1
+    shares = [count * len(chunk) / total for chunk in chunks]
+    allocation = [int(share) for share in shares]
+
+    # Attribution du reste aux segments ayant la plus grande partie fractionnaire
+    remainder = count - sum(allocation)
+    order = sorted(range(len(chunks)), key=lambda i: shares[i] - allocation[i], reverse=True)
+    for i in order[:remainder]:
+        allocation[i] += 1
+
+    return allocation
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"[\W_]+", " ", question.casefold()).strip()
+
+def merge_flashcards(results: List[List[Dict]], count: int) -> List[Dict]:
+    """Fusionner les flashcards de chaque segment sans doublons, dans la limite de count.
+
+    Les segments sont parcourus à tour de rôle pour que chaque partie du cours
+    reste représentée lorsque le résultat est tronqué.
+    """
+    merged = []
+    seen = set()
+    for rank in range(max((len(cards) for cards in results), default=0)):
+        for cards in results:
+            if rank >= len(cards):
+                continue
+            key = normalize_question(cards[rank]["question"])
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(cards[rank])
+
+    return merged[:count]
\ No newline at end of file
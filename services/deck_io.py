@@ -0,0 +1,169 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, List, Optional
+from pydantic import ValidationError
+from supabase import AsyncClient
+from config import get_settings
+from models.flashcard import FailedFlashcard, FlashcardCreate, FlashcardImportResult, FlashcardResponse
+from services.flashcard_service import create_flashcards_bulk, encode_cursor, get_user_flashcards
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_COLUMNS = ["id", "question", "answer", "course_name", "tags", "language", "created_at"]
+
+# Nombre maximal d'erreurs détaillées renvoyées par un import
+MAX_REPORTED_FAILURES = 100
+
+def _csv_line(values: List[str]) -> str:
+    output = io.StringIO()
+    csv.writer(output).writerow(values)
+    return output.getvalue()
+
+def _format_card(card: FlashcardResponse, fmt: str) -> str:
+    if fmt == "csv":
+        return _csv_line([
+            card.id,
+            card.question,
+            card.answer,
+            card.course_name or "",
+            ";".join(card.tags),
+            card.language.value if card.language else "",
+            card.created_at.isoformat(),
+        ])
+    return card.model_dump_json() + "\n"
+
+async def export_flashcards(
+        user_id: str,
+        supabase: AsyncClient,
+        fmt: str,
+        course_name: Optional[str] = None,
+        tags: Optional[List[str]] = None
+) -> AsyncIterator[str]:
+    """Produire les flashcards d'un utilisateur ligne par ligne, page par page via le curseur."""
+    page_size = get_settings().export_page_size
+    if fmt == "csv":
+        yield _csv_line(CSV_COLUMNS)
+
+    cursor = None
+    while True:
+        flashcards = await get_user_flashcards(
+            user_id,
+            supabase,
+            limit=page_size,
+            course_name=course_name,
+            tags=tags,
+            cursor=cursor
+        )
+        for card in flashcards:
+            yield _format_card(card, fmt)
+
+        if len(flashcards) < page_size:
+            break
+        cursor = encode_cursor(flashcards[-1])
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Découper un flux d'octets UTF-8 en lignes sans le charger entièrement."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        # La dernière ligne peut être incomplète : elle attend le morceau suivant
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def _iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Regrouper les lignes d'un CSV en enregistrements, un champ entre guillemets pouvant contenir des sauts de ligne."""
+    record = ""
+    async for line in lines:
+        record += line
+        # Un nombre impair de guillemets signifie qu'un champ n'est pas encore refermé
+        if record.count('"') % 2 == 0:
+            yield record
+            record = ""
+    if record:
+        yield record
+
+def _parse_csv_record(record: str, header: List[str]) -> FlashcardCreate:
+    values = next(csv.reader([record]))
+    row = dict(zip(header, values))
+    # En-tête sans ces colonnes ou ligne trop courte : la carte serait vide
+    if not row.get("question") or not row.get("answer"):
+        raise ValueError("Les colonnes question et answer sont obligatoires et ne peuvent pas être vides")
+    return FlashcardCreate(
+        question=row["question"],
+        answer=row["answer"],
+        course_name=row.get("course_name") or None,
+        tags=[tag for tag in row.get("tags", "").split(";") if tag],
+        language=row.get("language") or None
+    )
+
+def _parse_ndjson_record(record: str) -> FlashcardCreate:
+    return FlashcardCreate(**json.loads(record))
+
+async def _iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[str]:
+    lines = _iter_lines(chunks)
+    records = _iter_csv_records(lines) if fmt == "csv" else lines
+    async for record in records:
+        if record.strip():
+            yield record
+
+async def import_flashcards(
+        user_id: str,
+        supabase: AsyncClient,
+        chunks: AsyncIterator[bytes],
+        fmt: str
+) -> FlashcardImportResult:
+    """Importer un flux NDJSON ou CSV par lots, sans jamais le charger entièrement en mémoire."""
+    # Assez de lignes en attente pour occuper tous les lots concurrents de l'insertion
+    settings = get_settings()
+    chunk_size = settings.batch_insert_chunk_size * settings.batch_insert_concurrency
+    result = FlashcardImportResult()
+    pending: List[FlashcardCreate] = []
+    pending_indices: List[int] = []
+    header: Optional[List[str]] = None
+
+    def record_failure(index: int, error: str) -> None:
+        result.failed_count += 1
+        if len(result.failed) < MAX_REPORTED_FAILURES:
+            result.failed.append(FailedFlashcard(index=index, error=error))
+
+    async def flush() -> None:
+        batch = await create_flashcards_bulk(pending, user_id, supabase)
+        result.created += batch.count
+        for failure in batch.failed:
+            record_failure(pending_indices[failure.index], failure.error)
+        pending.clear()
+        pending_indices.clear()
+
+    index = 0
+    async for record in _iter_records(chunks, fmt):
+        if fmt == "csv" and header is None:
+            header = [column.strip() for column in next(csv.reader([record]))]
+            continue
+
+        try:
+            if fmt == "csv":
+                flashcard = _parse_csv_record(record, header)
+            else:
+                flashcard = _parse_ndjson_record(record)
+        except (ValueError, TypeError, ValidationError, StopIteration) as e:
+            record_failure(index, str(e))
+        else:
+            pending.append(flashcard)
+            pending_indices.append(index)
+            if len(pending) >= chunk_size:
+                await flush()
+        index += 1
+
+    if pending:
+        await flush()
+    return result
\ No newline at end of file
@@ -0,0 +1,83 @@
+import hashlib
+import itertools
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+from config import Settings
+from models.flashcard import FlashcardResponse
+from services.cache import TTLCache
+from services.serialization import dumps
+
+def compute_etag(flashcards: List[FlashcardResponse]) -> str:
+    """ETag fort calculé sur la représentation JSON d'une page de flashcards."""
+    payload = dumps(flashcards, sort_keys=True)
+    return '"' + hashlib.sha256(payload).hexdigest() + '"'
+
+class FlashcardListCache:
+    """Cache en lecture des listes de flashcards, par utilisateur et par jeu de filtres.
+
+    Toute écriture sur les flashcards d'un utilisateur supprime l'ensemble de
+    ses pages en cache. Le cache est propre au processus : le TTL borne le
+    délai pendant lequel un autre worker peut servir une page périmée.
+
+    Chaque invalidation fait avancer la génération de l'utilisateur : une page
+    lue avant une écriture concurrente n'est pas mise en cache si la génération
+    a changé pendant la requête.
+    """
+
+    # Durée de conservation des générations : doit dépasser la plus longue requête de lecture
+    GENERATION_TTL = 3600.0
+
+    def __init__(self, max_users: int, max_pages_per_user: int, ttl: float):
+        self.ttl = ttl
+        self.max_pages_per_user = max_pages_per_user
+        self._users = TTLCache(maxsize=max_users, ttl=ttl)
+        self._generations = TTLCache(maxsize=max_users, ttl=self.GENERATION_TTL)
+        self._counter = itertools.count(1)
+
+    def generation(self, user_id: str) -> int:
+        """Génération courante à relire avant la requête puis à passer à set()."""
+        return self._generations.get(user_id, 0)
+
+    def get(self, user_id: str, key: Hashable) -> Optional[Tuple[List[FlashcardResponse], str]]:
+        pages = self._users.get(user_id)
+        if pages is None:
+            return None
+
+        entry = pages.get(key)
+        if entry is None:
+            return None
+
+        flashcards, etag, expires_at = entry
+        if expires_at <= time.monotonic():
+            del pages[key]
+            return None
+        return flashcards, etag
+
+    def set(self, user_id: str, key: Hashable, flashcards: List[FlashcardResponse], generation: int) -> str:
+        etag = compute_etag(flashcards)
+        if self.generation(user_id) != generation:
+            # Écriture survenue pendant la lecture : la page est peut-être déjà périmée
+            return etag
+        pages: Optional[Dict] = self._users.get(user_id)
+        if pages is None or len(pages) >= self.max_pages_per_user:
+            pages = {}
+        pages[key] = (flashcards, etag, time.monotonic() + self.ttl)
+        self._users.set(user_id, pages)
+        return etag
+
+    def invalidate(self, user_id: str) -> None:
+        self._generations.set(user_id, next(self._counter))
+        self._users.pop(user_id)
+
+_flashcard_cache: Optional[FlashcardListCache] = None
+
+def get_flashcard_cache(settings: Settings) -> Optional[FlashcardListCache]:
+    """Renvoyer le cache des listes de flashcards du worker, ou None s'il est désactivé."""
+    global _flashcard_cache
+    if _flashcard_cache is None and settings.flashcard_cache_enabled:
+        _flashcard_cache = FlashcardListCache(
+            max_users=settings.flashcard_cache_max_users,
+            max_pages_per_user=settings.flashcard_cache_max_pages_per_user,
+            ttl=settings.flashcard_cache_ttl
+        )
+    return _flashcard_cache
\ No newline at end of file
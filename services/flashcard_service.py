@@ -1,26 +1,97 @@
-from typing import List, Optional
-from models.flashcard import FlashcardCreate, FlashcardResponse
-from config import get_settings
-from supabase import create_client
+from typing import List, Optional, Tuple
+from models.flashcard import (
+    FailedFlashcard,
+    FlashcardBatch,
+    FlashcardChanges,
+    FlashcardCreate,
+    FlashcardResponse
+)
+from pydantic import TypeAdapter
+from supabase import AsyncClient
+from config import Settings, get_settings
+from services.flashcard_cache import compute_etag, get_flashcard_cache
+from services.metrics import record_cache_lookup, span
+from datetime import datetime, timedelta, timezone
+import asyncio
+import base64
+import binascii
+import json
+import random
+import uuid
+import httpx
 
-settings = get_settings()
+# Validation en un seul appel d'une liste de lignes renvoyées par PostgREST
+_flashcard_rows = TypeAdapter(List[FlashcardResponse])
 
-def get_supabase_client():
-    return create_client(settings.supabase_url, settings.supabase_key)
+# Colonnes lues pour une flashcard : "*" ramènerait aussi search_vector,
+# volumineux et inutile à l'API
+FLASHCARD_COLUMNS = ",".join(FlashcardResponse.model_fields)
 
-async def create_flashcard(flashcard: FlashcardCreate, user_id: str) -> FlashcardResponse:
-    """Créer une nouvelle flashcard dans la base de données."""
-    supabase = get_supabase_client()
+def _encode_position(timestamp: datetime, card_id: str) -> str:
+    position = json.dumps([timestamp.isoformat(), card_id])
+    return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii")
+
+def _decode_position(token: str) -> Tuple[str, str]:
+    timestamp, card_id = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    # Les valeurs sont insérées dans une expression or=(...) de PostgREST : seules
+    # une date ISO 8601 et un UUID, réécrits sous forme canonique, sont acceptés
+    return datetime.fromisoformat(timestamp).isoformat(), str(uuid.UUID(card_id))
+
+def encode_cursor(card: FlashcardResponse) -> str:
+    """Encoder la position (created_at, id) d'une flashcard en curseur opaque."""
+    return _encode_position(card.created_at, card.id)
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Décoder un curseur opaque en couple (created_at, id)."""
+    try:
+        return _decode_position(cursor)
+    except (binascii.Error, UnicodeError, ValueError, TypeError, AttributeError):
+        raise ValueError("Curseur de pagination invalide")
+
+class SyncTokenExpired(Exception):
+    """Le jeton précède la rétention des suppressions : une resynchronisation complète est nécessaire."""
+
+def encode_sync_token(change_xid: str, card_id: str) -> str:
+    """Encoder la position (change_xid, id) d'une modification et la date d'émission du jeton."""
+    position = json.dumps([str(change_xid), card_id, datetime.now(timezone.utc).isoformat()])
+    return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii")
+
+def decode_sync_token(token: str) -> Tuple[str, str, datetime]:
+    """Décoder un jeton de synchronisation en (change_xid, id, date d'émission)."""
+    try:
+        change_xid, card_id, issued_at = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        if not str(change_xid).isdigit():
+            raise ValueError(change_xid)
+        issued_at = datetime.fromisoformat(issued_at)
+        if issued_at.tzinfo is None:
+            raise ValueError(issued_at)
+        return str(change_xid), str(uuid.UUID(card_id)), issued_at
+    except (binascii.Error, UnicodeError, ValueError, TypeError, AttributeError):
+        raise ValueError("Jeton de synchronisation invalide")
+
+def invalidate_user_flashcards(user_id: str) -> None:
+    """Supprimer les listes en cache d'un utilisateur après une écriture sur ses flashcards."""
+    cache = get_flashcard_cache(get_settings())
+    if cache is not None:
+        cache.invalidate(user_id)
 
+async def create_flashcard(
+        flashcard: FlashcardCreate,
+        user_id: str,
+        supabase: AsyncClient
+) -> FlashcardResponse:
+    """Créer une nouvelle flashcard dans la base de données."""
     data = {
         "user_id": user_id,
         "question": flashcard.question,
         "answer": flashcard.answer,
         "course_name": flashcard.course_name,
         "tags": flashcard.tags,
+        "language": flashcard.language.value if flashcard.language else None,
     }
 
-    result = supabase.table("flashcards").insert(data).execute()
+    result = await supabase.table("flashcards").insert(data).execute()
+    invalidate_user_flashcards(user_id)
 
     if len(result.data) == 0:
         raise ValueError("Échec de création de la flashcard")
@@ -28,13 +99,74 @@ async def create_flashcard(flashcard: FlashcardCreate, user_id: str) -> Flashcar
     created_card = result.data[0]
     return FlashcardResponse(**created_card)
 
-async def create_flashcards_batch(
+# Erreurs PostgREST/Postgres pour lesquelles un nouvel essai peut réussir :
+# PostgREST indisponible, conflit de sérialisation, interblocage, délai dépassé
+TRANSIENT_ERROR_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003", "40001", "40P01", "57014"}
+
+def _is_transient(error: Exception) -> bool:
+    # Seules les erreurs survenues avant l'envoi de la requête sont sûres à
+    # réessayer : après un ReadTimeout, PostgREST a peut-être déjà inséré le lot
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    return str(getattr(error, "code", "")) in TRANSIENT_ERROR_CODES
+
+# Classes SQLSTATE propres à certaines lignes (donnée invalide, contrainte violée) :
+# seules ces erreurs justifient de couper le lot pour isoler les lignes fautives
+ROW_ERROR_CLASSES = ("22", "23")
+
+def _is_row_error(error: Exception) -> bool:
+    return str(getattr(error, "code", "")).startswith(ROW_ERROR_CLASSES)
+
+async def _insert_chunk(
+        rows: List[dict],
+        supabase: AsyncClient,
+        max_retries: int,
+        retry_backoff: float
+) -> List[dict]:
+    """Insérer un lot, en réessayant les échecs transitoires avec un délai exponentiel."""
+    for attempt in range(max_retries + 1):
+        try:
+            result = await supabase.table("flashcards").insert(rows).execute()
+            return result.data
+        except Exception as e:
+            if not _is_transient(e) or attempt == max_retries:
+                raise
+            await asyncio.sleep(retry_backoff * 2 ** attempt * (1 + random.random()))
+
+async def _insert_isolating_failures(
+        rows: List[dict],
+        start: int,
+        supabase: AsyncClient,
+        settings: Settings
+) -> Tuple[List[dict], List[FailedFlashcard]]:
+    """Insérer un lot ; en cas d'erreur sur une ligne, le couper en deux pour isoler les lignes fautives.
+
+    Les autres erreurs (schéma, droits, service indisponible) feraient échouer
+    chaque moitié de la même façon : tout le lot est alors marqué en échec.
+    """
+    try:
+        created = await _insert_chunk(rows, supabase, settings.batch_insert_max_retries, settings.batch_insert_retry_backoff)
+        return created, []
+    except Exception as e:
+        if len(rows) == 1 or not _is_row_error(e):
+            return [], [FailedFlashcard(index=start + i, error=str(e)) for i in range(len(rows))]
+
+    middle = len(rows) // 2
+    left_created, left_failed = await _insert_isolating_failures(rows[:middle], start, supabase, settings)
+    right_created, right_failed = await _insert_isolating_failures(rows[middle:], start + middle, supabase, settings)
+    return left_created + right_created, left_failed + right_failed
+
+async def create_flashcards_bulk(
         flashcards: List[FlashcardCreate],
-        user_id: str
-) -> List[FlashcardResponse]:
-    """Créer plusieurs flashcards en une seule opération."""
-    supabase = get_supabase_client()
+        user_id: str,
+        supabase: AsyncClient
+) -> FlashcardBatch:
+    """Insérer un grand nombre de flashcards par lots concurrents, avec succès partiel.
 
+    Les flashcards créées sont renvoyées dans l'ordre d'entrée ; celles en
+    échec sont listées avec leur position dans la liste reçue.
+    """
+    settings = get_settings()
     data = []
     for flashcard in flashcards:
         data.append({
@@ -43,27 +175,54 @@ async def create_flashcards_batch(
             "answer": flashcard.answer,
             "course_name": flashcard.course_name,
             "tags": flashcard.tags,
+            "language": flashcard.language.value if flashcard.language else None,
         })
 
-    result = supabase.table("flashcards").insert(data).execute()
+    chunk_size = max(settings.batch_insert_chunk_size, 1)
+    semaphore = asyncio.Semaphore(settings.batch_insert_concurrency)
 
-    if len(result.data) == 0:
+    async def insert(start: int) -> Tuple[List[dict], List[FailedFlashcard]]:
+        async with semaphore:
+            return await _insert_isolating_failures(data[start:start + chunk_size], start, supabase, settings)
+
+    try:
+        with span("db_insert"):
+            results = await asyncio.gather(*(insert(start) for start in range(0, len(data), chunk_size)))
+    finally:
+        invalidate_user_flashcards(user_id)
+
+    created_cards = _flashcard_rows.validate_python([card for created, _ in results for card in created])
+    failed = [failure for _, failures in results for failure in failures]
+    return FlashcardBatch(flashcards=created_cards, count=len(created_cards), failed=failed)
+
+async def create_flashcards_batch(
+        flashcards: List[FlashcardCreate],
+        user_id: str,
+        supabase: AsyncClient
+) -> List[FlashcardResponse]:
+    """Créer plusieurs flashcards en une seule opération."""
+    batch = await create_flashcards_bulk(flashcards, user_id, supabase)
+
+    if batch.count == 0:
         raise ValueError("Échec de création des flashcards")
     
-    created_cards = [FlashcardResponse(**card) for card in result.data]
-    return created_cards
+    return batch.flashcards
 
 async def get_user_flashcards(
         user_id: str,
+        supabase: AsyncClient,
         limit: int = 100,
         offset: int = 0,
         course_name: Optional[str] = None,
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        cursor: Optional[str] = None
 ) -> List[FlashcardResponse]:
-    """Récupérer les flashcards d'un utilisateur avec filtrage optionnel."""
-    supabase = get_supabase_client()
+    """Récupérer les flashcards d'un utilisateur avec filtrage optionnel.
 
-    query = supabase.table("flashcards").select("*").eq("user_id", user_id)
+    Avec un curseur, la page commence juste après la position qu'il encode
+    (pagination par clé, indépendante de la profondeur) ; sinon offset est utilisé.
+    """
+    query = supabase.table("flashcards").select(FLASHCARD_COLUMNS).eq("user_id", user_id).is_("deleted_at", "null")
 
     # Application des filtres si fournis
     if course_name:
@@ -72,24 +231,162 @@ async def get_user_flashcards(
     if tags and len(tags) > 0:
         query = query.contains("tags", tags)
 
+    # Ordre total (created_at, id) pour que la pagination soit stable
+    query = query.order("created_at", desc=True).order("id", desc=True)
+
     # Application de la pagination
-    query = query.range(offset, offset + limit - 1).order("created_at", desc=True)
+    if cursor:
+        created_at, card_id = decode_cursor(cursor)
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt."{card_id}")'
+        ).limit(limit)
+    else:
+        query = query.range(offset, offset + limit - 1)
 
-    result = query.execute()
+    result = await query.execute()
 
-    return [FlashcardResponse(**card) for card in result.data]
+    return _flashcard_rows.validate_python(result.data)
 
-async def delete_flashcard(flashcard_id: str, user_id: str) -> bool:
-    """Supprimer une flashcard par ID, en s'assurant qu'elle appartient à l'utilisateur spécifié."""
-    supabase = get_supabase_client()
+async def get_user_flashcards_page(
+        user_id: str,
+        supabase: AsyncClient,
+        limit: int = 100,
+        offset: int = 0,
+        course_name: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        cursor: Optional[str] = None
+) -> Tuple[List[FlashcardResponse], str]:
+    """Récupérer une page de flashcards et son ETag, en passant par le cache de l'utilisateur."""
+    cache = get_flashcard_cache(get_settings())
+    key = (limit, offset, cursor, course_name, tuple(sorted(tags)) if tags else None)
+    generation = 0
+    if cache is not None:
+        cached = cache.get(user_id, key)
+        record_cache_lookup("flashcards", cached is not None)
+        if cached is not None:
+            return cached
+        generation = cache.generation(user_id)
 
-    # Vérification que la flashcard appartient à l'utilisateur
-    result = supabase.table("flashcards").select("*").eq("id", flashcard_id).eq("user_id", user_id).execute()
+    flashcards = await get_user_flashcards(
+        user_id,
+        supabase,
+        limit=limit,
+        offset=offset,
+        course_name=course_name,
+        tags=tags,
+        cursor=cursor
+    )
+
+    if cache is None:
+        return flashcards, compute_etag(flashcards)
+    return flashcards, cache.set(user_id, key, flashcards, generation)
+
+async def delete_flashcard(flashcard_id: str, user_id: str, supabase: AsyncClient) -> bool:
+    """Supprimer une flashcard par ID, en s'assurant qu'elle appartient à l'utilisateur spécifié."""
+    # Suppression logique : la flashcard devient une pierre tombale pour la synchronisation.
+    # Le filtre sur user_id garantit la propriété dans la même requête que la suppression.
+    result = await (
+        supabase.table("flashcards")
+        .update({"deleted_at": datetime.now(timezone.utc).isoformat()})
+        .eq("id", flashcard_id)
+        .eq("user_id", user_id)
+        .is_("deleted_at", "null")
+        .execute()
+    )
 
     if len(result.data) == 0:
         raise ValueError("Flashcard non trouvée ou n'appartient pas à l'utilisateur")
-    
-    # Si la flashcard existe et appartient à l'utilisateur, la supprimer
-    delete_result = supabase.table("flashcards").delete().eq("id", flashcard_id).execute()
 
-    return True
\ No newline at end of file
+    invalidate_user_flashcards(user_id)
+    return True
+
+async def delete_flashcards(
+        user_id: str,
+        supabase: AsyncClient,
+        ids: Optional[List[str]] = None,
+        course_name: Optional[str] = None,
+        tags: Optional[List[str]] = None
+) -> List[str]:
+    """Supprimer les flashcards d'un utilisateur par IDs ou par filtre et renvoyer les IDs supprimés."""
+    if not ids and not course_name and not tags:
+        raise ValueError("Indiquez des IDs ou un filtre course_name/tags")
+
+    deleted_at = datetime.now(timezone.utc).isoformat()
+
+    def build_query():
+        query = (
+            supabase.table("flashcards")
+            .update({"deleted_at": deleted_at})
+            .eq("user_id", user_id)
+            .is_("deleted_at", "null")
+        )
+        if course_name:
+            query = query.eq("course_name", course_name)
+        if tags:
+            query = query.contains("tags", tags)
+        return query
+
+    deleted_ids = []
+    try:
+        if ids:
+            # Les IDs sont envoyés dans l'URL : découpage pour rester sous les limites de longueur
+            chunk_size = get_settings().bulk_delete_chunk_size
+            for start in range(0, len(ids), chunk_size):
+                result = await build_query().in_("id", ids[start:start + chunk_size]).execute()
+                deleted_ids.extend(card["id"] for card in result.data)
+        else:
+            result = await build_query().execute()
+            deleted_ids.extend(card["id"] for card in result.data)
+    finally:
+        invalidate_user_flashcards(user_id)
+
+    return deleted_ids
+
+async def get_flashcard_changes(
+        user_id: str,
+        supabase: AsyncClient,
+        since: Optional[str] = None,
+        limit: int = 500
+) -> FlashcardChanges:
+    """Récupérer les flashcards créées, modifiées ou supprimées depuis un jeton de synchronisation.
+
+    Les modifications sont lues dans l'ordre (change_xid, id) et seulement pour
+    les transactions déjà terminées (voir flashcard_changes) : une écriture
+    validée après l'émission d'un jeton ne peut pas se retrouver derrière lui.
+    Sans jeton, tout l'historique de l'utilisateur est parcouru depuis le début.
+    Un jeton plus ancien que la rétention des suppressions lève SyncTokenExpired.
+    """
+    params = {"p_user_id": user_id, "p_limit": limit}
+    if since:
+        change_xid, card_id, issued_at = decode_sync_token(since)
+        retention = timedelta(days=get_settings().sync_tombstone_retention_days)
+        if datetime.now(timezone.utc) - issued_at > retention:
+            raise SyncTokenExpired("Jeton de synchronisation expiré : resynchronisation complète nécessaire")
+        params.update(p_after_xid=change_xid, p_after_id=card_id)
+
+    result = await supabase.rpc("flashcard_changes", params).execute()
+
+    flashcards = []
+    deleted_ids = []
+    for card in result.data:
+        if card.get("deleted_at"):
+            deleted_ids.append(card["id"])
+        else:
+            flashcards.append(FlashcardResponse(**card))
+
+    # Le jeton est réémis à chaque appel pour repousser son expiration
+    if result.data:
+        last = result.data[-1]
+        next_token = encode_sync_token(last["change_xid"], last["id"])
+    elif since:
+        next_token = encode_sync_token(change_xid, card_id)
+    else:
+        next_token = ""
+
+    return FlashcardChanges(
+        flashcards=flashcards,
+        deleted_ids=deleted_ids,
+        next_token=next_token,
+        has_more=len(result.data) == limit
+    )
@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+from config import Settings
+from services.cache import TTLCache
+from services.metrics import record_rejection
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Codes HTTP des erreurs Google (google.api_core) qui valent la peine d'être réessayées
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class GeminiUnavailable(Exception):
+    """Appel Gemini refusé sans être tenté ; retry_after indique quand réessayer (en secondes)."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class GeminiOverloaded(GeminiUnavailable):
+    """Trop d'appels Gemini en cours et en attente dans ce worker."""
+
+class GeminiCircuitOpen(GeminiUnavailable):
+    """Gemini est considéré en panne : les appels échouent immédiatement."""
+
+class QuotaExceeded(Exception):
+    """L'utilisateur a épuisé son quota de générations."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def is_transient_error(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return getattr(error, "code", None) in TRANSIENT_STATUS_CODES
+
+class CircuitBreaker:
+    """Disjoncteur : ouvert après N échecs transitoires consécutifs, puis un appel d'essai.
+
+    Fermé, tout passe. Ouvert, tout échoue immédiatement pendant recovery_time.
+    Ensuite un seul appel d'essai est autorisé (demi-ouvert) : son succès
+    referme le disjoncteur, son échec le rouvre pour une nouvelle période.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_time: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.recovery_time:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(self.recovery_time - (time.monotonic() - self._opened_at), 1.0)
+
+    def check(self) -> None:
+        """Lever GeminiCircuitOpen si aucun appel ne doit être tenté maintenant."""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        raise GeminiCircuitOpen("Le service de génération est momentanément indisponible", self.retry_after())
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            if self._opened_at is None or self._probing:
+                logger.warning("Disjoncteur Gemini ouvert après %d échecs consécutifs", self._failures)
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        # Appel d'essai terminé sans verdict (erreur non transitoire, annulation)
+        self._probing = False
+
+class GeminiGuard:
+    """Contrôle d'admission des appels Gemini d'un worker.
+
+    Au plus max_concurrency appels simultanés ; au-delà, max_queue appelants
+    attendent au plus queue_timeout secondes et les suivants sont refusés
+    immédiatement. Chaque tentative est bornée par call_timeout et les échecs
+    transitoires sont réessayés avec un délai exponentiel aléatoire, sous le
+    contrôle du disjoncteur.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        call_timeout: float,
+        max_retries: int,
+        retry_backoff: float,
+        breaker: CircuitBreaker
+    ):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.breaker = breaker
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+
+    def check_available(self) -> None:
+        """Refuser d'emblée une demande si le disjoncteur est ouvert, sans consommer d'essai."""
+        if self.breaker.state == "open":
+            record_rejection("gemini", "circuit_open")
+            raise GeminiCircuitOpen("Le service de génération est momentanément indisponible", self.breaker.retry_after())
+
+    @asynccontextmanager
+    async def _slot(self):
+        if self._semaphore.locked():
+            if self._waiting >= self.max_queue:
+                record_rejection("gemini", "overloaded")
+                raise GeminiOverloaded("Trop de générations en cours, réessayez dans quelques instants", self.queue_timeout)
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                record_rejection("gemini", "queue_timeout")
+                raise GeminiOverloaded("Trop de générations en cours, réessayez dans quelques instants", self.queue_timeout)
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    def _check_breaker(self) -> None:
+        try:
+            self.breaker.check()
+        except GeminiCircuitOpen:
+            record_rejection("gemini", "circuit_open")
+            raise
+
+    def _backoff(self, attempt: int) -> float:
+        # Délai exponentiel avec « full jitter » pour désynchroniser les workers
+        return random.uniform(0, self.retry_backoff * 2 ** attempt)
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Exécuter un appel Gemini sous contrôle d'admission, délai maximal et réessais."""
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            try:
+                async with self._slot():
+                    result = await asyncio.wait_for(fn(), self.call_timeout)
+            except GeminiUnavailable:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_transient_error(e):
+                    self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                logger.warning("Échec transitoire d'un appel Gemini (tentative %d): %r", attempt + 1, e)
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def stream(self, fn: Callable[[], Awaitable[AsyncIterator[T]]]) -> AsyncIterator[T]:
+        """Variante de call() pour une réponse en streaming.
+
+        Le délai maximal s'applique à l'ouverture puis à chaque morceau ; un
+        échec n'est réessayé que si rien n'a encore été transmis à l'appelant.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            received = False
+            try:
+                async with self._slot():
+                    response = await asyncio.wait_for(fn(), self.call_timeout)
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.call_timeout)
+                        except StopAsyncIteration:
+                            break
+                        received = True
+                        yield chunk
+            except GeminiUnavailable:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_transient_error(e):
+                    self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                if received or attempt == self.max_retries:
+                    raise
+                logger.warning("Échec transitoire d'un appel Gemini en streaming (tentative %d): %r", attempt + 1, e)
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return
+
+            await asyncio.sleep(self._backoff(attempt))
+
+class TokenBucketQuota:
+    """Quotas par utilisateur en seau à jetons : rate jetons par seconde, burst au maximum.
+
+    Seuls les seaux entamés sont conservés : une entrée expire quand le seau
+    serait de nouveau plein, ce qui équivaut à un seau neuf.
+    """
+
+    def __init__(self, rate: float, burst: int, max_users: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = TTLCache(maxsize=max_users, ttl=burst / rate if rate > 0 else 0)
+
+    def consume(self, user_id: str, tokens: float = 1.0) -> None:
+        """Retirer tokens du seau de l'utilisateur ou lever QuotaExceeded."""
+        if self.rate <= 0:
+            return
+
+        now = time.monotonic()
+        level, updated_at = self._buckets.get(user_id, (float(self.burst), now))
+        level = min(self.burst, level + (now - updated_at) * self.rate)
+
+        if level < tokens:
+            record_rejection("gemini", "quota")
+            raise QuotaExceeded(
+                "Quota de générations atteint, réessayez plus tard",
+                (tokens - level) / self.rate
+            )
+
+        level -= tokens
+        self._buckets.set(user_id, (level, now), ttl=(self.burst - level) / self.rate)
+
+    def refund(self, user_id: str, tokens: float = 1.0) -> None:
+        """Rendre des jetons consommés pour une demande finalement non traitée."""
+        if self.rate <= 0:
+            return
+
+        now = time.monotonic()
+        entry = self._buckets.get(user_id)
+        if entry is None:
+            # Seau expiré : il est déjà plein
+            return
+        level, updated_at = entry
+        level = level + (now - updated_at) * self.rate + tokens
+        if level >= self.burst:
+            self._buckets.pop(user_id)
+        else:
+            self._buckets.set(user_id, (level, now), ttl=(self.burst - level) / self.rate)
+
+_guard: Optional[GeminiGuard] = None
+_quota: Optional[TokenBucketQuota] = None
+
+def get_gemini_guard(settings: Settings) -> GeminiGuard:
+    global _guard
+    if _guard is None:
+        _guard = GeminiGuard(
+            max_concurrency=settings.gemini_max_concurrency,
+            max_queue=settings.gemini_max_queue,
+            queue_timeout=settings.gemini_queue_timeout,
+            call_timeout=settings.gemini_call_timeout,
+            max_retries=settings.gemini_max_retries,
+            retry_backoff=settings.gemini_retry_backoff,
+            breaker=CircuitBreaker(settings.gemini_breaker_threshold, settings.gemini_breaker_recovery)
+        )
+    return _guard
+
+def get_generation_quota(settings: Settings) -> TokenBucketQuota:
+    global _quota
+    if _quota is None:
+        _quota = TokenBucketQuota(
+            rate=settings.generation_quota_per_minute / 60,
+            burst=settings.generation_quota_burst,
+            max_users=settings.generation_quota_max_users
+        )
+    return _quota
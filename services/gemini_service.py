@@ -1,74 +1,148 @@
-import google.generativeai as genai
-from typing import List
-from config import get_settings
+import asyncio
+import hashlib
+import logging
+import math
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from config import Settings, get_settings
 import json
 from models.flashcard import FlashcardCreate, Language
+from services.ocr_cache import get_ocr_cache, image_cache_key
+from services.chunking import split_text, distribute_count, merge_flashcards, normalize_question
+from services.json_stream import JSONArrayStreamParser
+from services.image_service import prepare_images
+from services.singleflight import SingleFlight
+from services.metrics import span, track_call
+from services.gemini_guard import GeminiUnavailable, get_gemini_guard, is_transient_error
 
-settings = get_settings()
+logger = logging.getLogger(__name__)
 
-# Configuration du client API Gemini
-genai.configure(api_key=settings.gemini_api_key)
+VISION_MODEL = "gemini-pro-vision"
+TEXT_MODEL = "gemini-pro"
 
-async def get_gemini_model():
-    return genai.GenerativeModel("gemini-pro-vision")
+# SDK Gemini importé et configuré au premier usage, modèles construits une fois par worker
+_genai = None
+_models: Dict[str, Any] = {}
 
-async def extract_text_from_images(image_data_list: List[str]) -> str:
-    """Extraire le texte à partir d'une liste d'images encodées en base64."""
-    model = await get_gemini_model()
+def init_gemini(settings: Settings) -> None:
+    """Importer et configurer le SDK Gemini (une seule fois par worker)."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=settings.gemini_api_key)
+        _genai = genai
 
-    # Conversion des images encodées en base64 au format attendu par Gemini
-    image_parts = []
-    for image_data in image_data_list:
-        if image_data.startswith("data:image"):
-            # Extraire le contenu base64 après la virgule
-            image_data = image_data.split(",")[1]
+def close_gemini() -> None:
+    # Les clients asynchrones des modèles sont liés à la boucle d'événements qui s'arrête
+    _models.clear()
 
-        image_parts.append({
+def get_gemini_model(name: str = VISION_MODEL):
+    model = _models.get(name)
+    if model is None:
+        init_gemini(get_settings())
+        model = _models[name] = _genai.GenerativeModel(name)
+    return model
+
+OCR_PROMPT = "Extrais et retourne tout le contenu textuel de ces images. Formate-le clairement et préserve la structure des paragraphes."
+
+async def _extract_text_from_parts(image_bytes: List[bytes]) -> str:
+    """Extraire le texte d'un groupe d'images en un seul appel Gemini."""
+    settings = get_settings()
+    # Les mêmes images déjà traitées renvoient le texte en cache sans appel à Gemini
+    cache = get_ocr_cache(settings)
+    cache_key = image_cache_key(image_bytes)
+    if cache is not None:
+        cached_text = await cache.get(cache_key)
+        if cached_text is not None:
+            return cached_text
+
+    # Conversion des images au format attendu par Gemini, avec leur vrai type MIME
+    with span("preprocess"):
+        prepared_images = await prepare_images(image_bytes, settings)
+    image_parts = [
+        {
             "inline_data": {
-                "mime_type": "image/jpeg",
-                "data": image_data
+                "mime_type": image.mime_type,
+                "data": image.data
             }
-        })
+        }
+        for image in prepared_images
+    ]
 
-    # Génération d'un prompt pour extraire le texte des images
-    prompt = "Extrais et retourne tout le contenu textuel de ces images. Formate-le clairement et préserve la structure des paragraphes."
+    model = get_gemini_model(VISION_MODEL)
+    async with track_call("gemini", "ocr"):
+        response = await get_gemini_guard(settings).call(
+            lambda: model.generate_content_async([OCR_PROMPT, *image_parts])
+        )
 
-    response = await model.generate_content_async([prompt, *image_parts])
+    if cache is not None:
+        await cache.set(cache_key, response.text)
     return response.text
 
-async def generate_flashcards(
-        image_data_list: List[str],
-        count: int,
-        language: Language,
-        course_name: str = None,
-        tags: List[str] = []
-) -> List[FlashcardCreate]:
-    """Générer des flashcards en utilisant Google Gemini à partir du contenu des images."""
-    # Extraction du texte des images
-    extracted_text = await extract_text_from_images(image_data_list)
-
-    # Utilisation du texte pour générer des flashcards
-    model = genai.GenerativeModel("gemini-pro")
-
-    # Création d'un prompt pour générer des flashcards dans la langue spécifiée
-    lang_dict = {
-        Language.ENGLISH: "anglais",
-        Language.FRENCH: "français",
-        Language.SPANISH: "espagnol",
-        Language.GERMAN: "allemand",
-        Language.ITALIAN: "italien",
-        Language.VIETNAMESE: "vietnamien",
-        Language.THAI: "thaïlandais"
-    }
-
-    language_name = lang_dict.get(language, "français")
-
-    prompt = f"""
+async def _extract_group_with_retry(
+        image_bytes: List[bytes],
+        semaphore: asyncio.Semaphore
+) -> Optional[str]:
+    """Extraire le texte d'un groupe de pages, en réessayant avant d'abandonner ce groupe.
+
+    Seules les erreurs non transitoires (réponse vide ou bloquée...) sont
+    réessayées ici ; les erreurs transitoires l'ont déjà été par le garde.
+    """
+    settings = get_settings()
+    for attempt in range(settings.ocr_max_retries + 1):
+        try:
+            async with semaphore:
+                return await _extract_text_from_parts(image_bytes)
+        except GeminiUnavailable:
+            # Inutile de réessayer : le refus vaut pour toute la demande
+            raise
+        except Exception as e:
+            logger.warning("Échec OCR d'un groupe de pages (tentative %d): %s", attempt + 1, e)
+            if is_transient_error(e):
+                # Déjà réessayée par GeminiGuard.call : un nouvel essai multiplierait les appels
+                break
+            if attempt < settings.ocr_max_retries:
+                await asyncio.sleep(settings.ocr_retry_backoff * 2 ** attempt)
+    return None
+
+async def extract_text_from_images(image_bytes: List[bytes]) -> str:
+    """Extraire le texte à partir d'une liste d'images brutes."""
+    settings = get_settings()
+    if settings.ocr_mode != "parallel" or len(image_bytes) <= settings.ocr_group_size:
+        return await _extract_text_from_parts(image_bytes)
+
+    # OCR concurrent par petits groupes de pages, réassemblés dans l'ordre d'origine
+    semaphore = asyncio.Semaphore(settings.ocr_concurrency)
+    size = settings.ocr_group_size
+    texts = await asyncio.gather(*(
+        _extract_group_with_retry(image_bytes[i:i + size], semaphore)
+        for i in range(0, len(image_bytes), size)
+    ))
+
+    if all(text is None for text in texts):
+        raise ValueError("Impossible d'extraire le texte des images")
+
+    return "\n\n".join(text for text in texts if text)
+
+LANGUAGE_NAMES = {
+    Language.ENGLISH: "anglais",
+    Language.FRENCH: "français",
+    Language.SPANISH: "espagnol",
+    Language.GERMAN: "allemand",
+    Language.ITALIAN: "italien",
+    Language.VIETNAMESE: "vietnamien",
+    Language.THAI: "thaïlandais"
+}
+
+def _build_flashcards_prompt(text: str, count: int, language: Language) -> str:
+    """Créer le prompt de génération de flashcards dans la langue spécifiée."""
+    language_name = LANGUAGE_NAMES.get(language, "français")
+
+    return f"""
     En te basant sur le contenu de cours suivant, crée {count} flashcards en {language_name}.
     Chaque flashcard doit avoir une question et une réponse.
     
     Contenu du cours:
-    {extracted_text}
+    {text}
     
     Renvoie les flashcards sous forme de tableau JSON avec la structure suivante:
     [
@@ -86,35 +160,335 @@ async def generate_flashcards(
     Les réponses doivent être concises mais complètes.
     """
 
-    response = await model.generate_content_async(prompt)
+def _to_flashcard_data(fc_data: dict) -> dict:
+    return {"question": fc_data["question"], "answer": fc_data["answer"]}
 
-    # Extraction du tableau JSON de la réponse
+def _parse_flashcards(response_text: str) -> List[dict]:
+    """Extraire le tableau JSON de flashcards de la réponse du modèle."""
     try:
-        # Recherche du JSON dans le texte de réponse
-        response_text = response.text
-        start_idx = response_text.find('[')
-        end_idx = response_text.rfind(']') + 1
-
-        if start_idx >= 0 and end_idx > start_idx:
-            json_str = response_text[start_idx:end_idx]
-            flashcards_data = json.loads(json_str)
-        else:
+        parser = JSONArrayStreamParser()
+        flashcards_data = parser.feed(response_text)
+
+        if not parser.finished and not flashcards_data:
             # Repli si le formatage JSON a échoué
             raise ValueError("Impossible d'extraire le JSON de la réponse")
-        
-        # Conversion en objets FlashcardCreate
-        flashcards = []
-        for fc_data in flashcards_data:
-            flashcard = FlashcardCreate(
-                question=fc_data["question"],
-                answer=fc_data["answer"],
-                course_name=course_name,
-                tags=tags
-            )
-            flashcards.append(flashcard)
 
-        return flashcards
-    
+        return [_to_flashcard_data(fc_data) for fc_data in flashcards_data]
+
     except Exception as e:
         # Gestion des erreurs d'analyse JSON
-        raise ValueError(f"Échec d'analyse des flashcards générées: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Échec d'analyse des flashcards générées: {str(e)}")
+
+async def _generate_for_text(text: str, count: int, language: Language) -> List[dict]:
+    """Générer count flashcards pour un seul segment de texte."""
+    settings = get_settings()
+    model = get_gemini_model(TEXT_MODEL)
+    prompt = _build_flashcards_prompt(text, count, language)
+    async with track_call("gemini", "generation"):
+        response = await get_gemini_guard(settings).call(lambda: model.generate_content_async(prompt))
+
+    with span("parse"):
+        return _parse_flashcards(response.text)
+
+def _build_batch_prompt(requests: List[Tuple[str, int]], language: Language) -> str:
+    """Créer un prompt unique regroupant plusieurs demandes de génération, une section par demande."""
+    language_name = LANGUAGE_NAMES.get(language, "français")
+    sections = "\n".join(
+        f"""
+    ===== DEMANDE {index} : {count} flashcards =====
+    {text}
+    ===== FIN DE LA DEMANDE {index} ====="""
+        for index, (text, count) in enumerate(requests, start=1)
+    )
+
+    return f"""
+    Tu vas traiter {len(requests)} demandes indépendantes. Pour chacune, en te basant
+    uniquement sur son contenu de cours, crée le nombre de flashcards indiqué en {language_name}.
+    Chaque flashcard doit avoir une question et une réponse.
+    {sections}
+
+    Renvoie un unique objet JSON dont les clés sont les numéros des demandes et les
+    valeurs les tableaux de flashcards correspondants :
+    {{
+      "1": [{{"question": "Question 1", "answer": "Réponse 1"}}],
+      "2": [{{"question": "Question 1", "answer": "Réponse 1"}}]
+    }}
+
+    Les questions doivent tester les concepts clés, définitions ou applications du contenu.
+    Les réponses doivent être concises mais complètes.
+    """
+
+class GenerationBatcher:
+    """Regroupe les petites demandes de génération concurrentes en appels Gemini partagés.
+
+    Les demandes d'une même langue arrivées pendant la fenêtre de collecte sont
+    envoyées dans un seul prompt à sections délimitées ; la réponse est ensuite
+    répartie entre les appelants. Une section absente ou illisible est
+    régénérée individuellement pour ne jamais pénaliser l'exactitude.
+    """
+
+    def __init__(self, window: float, max_requests: int):
+        self.window = window
+        self.max_requests = max_requests
+        self._pending: Dict[Language, List[Tuple[str, int, asyncio.Future]]] = {}
+        # La boucle ne garde qu'une référence faible aux tâches : sans celle-ci,
+        # un appel groupé pourrait être détruit en cours et ses appelants bloqués
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def generate(self, text: str, count: int, language: Language) -> List[dict]:
+        future = asyncio.get_running_loop().create_future()
+        group = self._pending.setdefault(language, [])
+        group.append((text, count, future))
+
+        if len(group) == 1:
+            asyncio.get_running_loop().call_later(self.window, self._flush, language, group)
+        if len(group) >= self.max_requests:
+            self._flush(language, group)
+
+        return await future
+
+    def _flush(self, language: Language, group: list) -> None:
+        # Le groupe a peut-être déjà été envoyé parce qu'il était plein
+        if self._pending.get(language) is not group:
+            return
+        del self._pending[language]
+        task = asyncio.create_task(self._run(language, group))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, language: Language, group: list) -> None:
+        if len(group) == 1:
+            text, count, future = group[0]
+            await self._resolve_individually(text, count, language, future)
+            return
+
+        try:
+            model = get_gemini_model(TEXT_MODEL)
+            guard = get_gemini_guard(get_settings())
+            prompt = _build_batch_prompt([(text, count) for text, count, _ in group], language)
+            async with track_call("gemini", "generation_batch"):
+                response = await guard.call(lambda: model.generate_content_async(prompt))
+            response_text = response.text
+            with span("parse"):
+                sections = json.loads(response_text[response_text.find("{"):response_text.rfind("}") + 1])
+        except Exception as e:
+            logger.warning("Échec d'un appel de génération groupé (%d demandes): %s", len(group), e)
+            sections = {}
+
+        retries = []
+        for index, (text, count, future) in enumerate(group, start=1):
+            if future.done():
+                # Appelant parti entre-temps (requête annulée)
+                continue
+            try:
+                flashcards_data = [_to_flashcard_data(fc_data) for fc_data in sections[str(index)]]
+                if not flashcards_data:
+                    raise ValueError("Section vide")
+                future.set_result(flashcards_data[:count])
+            except Exception:
+                retries.append(self._resolve_individually(text, count, language, future))
+        await asyncio.gather(*retries)
+
+    async def _resolve_individually(self, text: str, count: int, language: Language, future: asyncio.Future) -> None:
+        try:
+            flashcards_data = await _generate_for_text(text, count, language)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(flashcards_data)
+
+_batcher: Optional[GenerationBatcher] = None
+
+async def _generate(text: str, count: int, language: Language) -> List[dict]:
+    """Générer les flashcards d'un texte, via le micro-batching pour les petites demandes."""
+    global _batcher
+    settings = get_settings()
+    if not settings.generation_batching_enabled \
+            or count > settings.generation_batch_max_count \
+            or len(text) > settings.generation_batch_max_chars:
+        return await _generate_for_text(text, count, language)
+
+    if _batcher is None:
+        _batcher = GenerationBatcher(
+            window=settings.generation_batch_window_ms / 1000,
+            max_requests=settings.generation_batch_max_requests
+        )
+    return await _batcher.generate(text, count, language)
+
+async def generate_flashcards_from_text(
+        extracted_text: str,
+        count: int,
+        language: Language
+) -> List[dict]:
+    """Générer des flashcards à partir d'un texte, découpé en segments s'il est trop long."""
+    settings = get_settings()
+    chunks = split_text(extracted_text, settings.generation_chunk_tokens)
+    if len(chunks) == 1:
+        return (await _generate(extracted_text, count, language))[:count]
+
+    # Map : génération en parallèle sur chaque segment, avec une légère
+    # surproduction pour compenser les doublons retirés à la fusion
+    semaphore = asyncio.Semaphore(settings.generation_concurrency)
+    ratio = 1 + settings.generation_overgenerate_ratio
+
+    async def generate_chunk(chunk: str, chunk_count: int) -> List[dict]:
+        if chunk_count == 0:
+            return []
+        try:
+            async with semaphore:
+                return await _generate(chunk, math.ceil(chunk_count * ratio), language)
+        except GeminiUnavailable:
+            raise
+        except Exception as e:
+            logger.warning("Échec de génération pour un segment du cours: %s", e)
+            return []
+
+    results = await asyncio.gather(*(
+        generate_chunk(chunk, chunk_count)
+        for chunk, chunk_count in zip(chunks, distribute_count(count, chunks))
+    ))
+
+    # Reduce : fusion dédoublonnée ramenée au nombre demandé
+    flashcards = merge_flashcards(results, count)
+    if not flashcards:
+        raise ValueError("Échec de génération des flashcards")
+    return flashcards
+
+async def _stream_for_text(text: str, count: int, language: Language) -> AsyncIterator[dict]:
+    """Produire les flashcards d'un segment au fil de la réponse en streaming du modèle."""
+    settings = get_settings()
+    model = get_gemini_model(TEXT_MODEL)
+    prompt = _build_flashcards_prompt(text, count, language)
+
+    parser = JSONArrayStreamParser()
+    try:
+        async with track_call("gemini", "generation_stream"):
+            chunks = get_gemini_guard(settings).stream(
+                lambda: model.generate_content_async(prompt, stream=True)
+            )
+            async for chunk in chunks:
+                for fc_data in parser.feed(chunk.text):
+                    yield _to_flashcard_data(fc_data)
+    except (KeyError, TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Échec d'analyse des flashcards générées: {str(e)}")
+
+async def stream_flashcards_from_text(
+        extracted_text: str,
+        count: int,
+        language: Language
+) -> AsyncIterator[dict]:
+    """Produire les flashcards dès qu'elles sont complètes, tous segments confondus."""
+    settings = get_settings()
+    chunks = split_text(extracted_text, settings.generation_chunk_tokens)
+    ratio = 1 + settings.generation_overgenerate_ratio if len(chunks) > 1 else 1
+    semaphore = asyncio.Semaphore(settings.generation_concurrency)
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    unavailable: List[GeminiUnavailable] = []
+
+    async def produce(chunk: str, chunk_count: int) -> None:
+        try:
+            if chunk_count > 0:
+                async with semaphore:
+                    async for fc_data in _stream_for_text(chunk, math.ceil(chunk_count * ratio), language):
+                        await queue.put(fc_data)
+        except GeminiUnavailable as e:
+            unavailable.append(e)
+        except Exception as e:
+            logger.warning("Échec de génération pour un segment du cours: %s", e)
+        finally:
+            await queue.put(done)
+
+    tasks = [
+        asyncio.create_task(produce(chunk, chunk_count))
+        for chunk, chunk_count in zip(chunks, distribute_count(count, chunks))
+    ]
+
+    try:
+        # Fusion au fil de l'eau : doublons ignorés, arrêt dès que count est atteint
+        seen = set()
+        pending = len(tasks)
+        while pending and len(seen) < count:
+            fc_data = await queue.get()
+            if fc_data is done:
+                pending -= 1
+                continue
+            key = normalize_question(fc_data["question"])
+            if key in seen:
+                continue
+            seen.add(key)
+            yield fc_data
+
+        if not seen:
+            if unavailable:
+                raise unavailable[0]
+            raise ValueError("Échec de génération des flashcards")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def stream_flashcards(
+        images: List[bytes],
+        count: int,
+        language: Language,
+        course_name: str = None,
+        tags: List[str] = []
+) -> AsyncIterator[FlashcardCreate]:
+    """Générer des flashcards à partir des images en les produisant une par une."""
+    extracted_text = await extract_text_from_images(images)
+
+    async for fc_data in stream_flashcards_from_text(extracted_text, count, language):
+        yield FlashcardCreate(
+            question=fc_data["question"],
+            answer=fc_data["answer"],
+            course_name=course_name,
+            tags=tags,
+            language=language
+        )
+
+def generation_key(images: List[bytes], count: int, language: Language, course_name: Optional[str]) -> str:
+    """Clé identifiant une demande de génération par le contenu de ses images et ses paramètres."""
+    params = json.dumps([count, language.value, course_name])
+    return hashlib.sha256(f"{image_cache_key(images)}:{params}".encode("utf-8")).hexdigest()
+
+_generation_flight = SingleFlight()
+
+async def _generate_flashcards_data(images: List[bytes], count: int, language: Language) -> List[dict]:
+    extracted_text = await extract_text_from_images(images)
+    return await generate_flashcards_from_text(extracted_text, count, language)
+
+async def generate_flashcards(
+        images: List[bytes],
+        count: int,
+        language: Language,
+        course_name: str = None,
+        tags: List[str] = []
+) -> List[FlashcardCreate]:
+    """Générer des flashcards en utilisant Google Gemini à partir du contenu des images.
+
+    Les demandes identiques en cours (mêmes images, nombre, langue et cours)
+    partagent un seul passage OCR + génération ; chacune reçoit ses propres
+    objets FlashcardCreate.
+    """
+    settings = get_settings()
+    if settings.generation_coalescing_enabled:
+        flashcards_data = await _generation_flight.do(
+            generation_key(images, count, language, course_name),
+            lambda: _generate_flashcards_data(images, count, language)
+        )
+    else:
+        flashcards_data = await _generate_flashcards_data(images, count, language)
+
+    # Conversion en objets FlashcardCreate
+    return [
+        FlashcardCreate(
+            question=fc_data["question"],
+            answer=fc_data["answer"],
+            course_name=course_name,
+            tags=tags,
+            language=language
+        )
+        for fc_data in flashcards_data
+    ]
\ No newline at end of file
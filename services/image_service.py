@@ -0,0 +1,144 @@
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+from config import Settings
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    """Déterminer le type MIME réel d'une image à partir de ses premiers octets."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp":
+        brand = data[8:12]
+        if brand in (b"heic", b"heix", b"hevc", b"hevx"):
+            return "image/heic"
+        if brand in (b"mif1", b"msf1", b"heim", b"heis"):
+            return "image/heif"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    return None
+
+_heif_registered = False
+
+def _register_heif_opener() -> None:
+    # Support optionnel des photos HEIC/HEIF des iPhone, chargé au premier
+    # prétraitement de chaque processus plutôt qu'au démarrage du worker
+    global _heif_registered
+    if _heif_registered:
+        return
+    _heif_registered = True
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        pass
+
+def _preprocess_sync(
+        data: bytes,
+        max_dimension: int,
+        quality: int,
+        grayscale: bool
+) -> PreparedImage:
+    """Réduire, nettoyer et recompresser une image ; exécuté dans le pool de processus."""
+    from PIL import Image, ImageOps
+    _register_heif_opener()
+
+    mime_type = sniff_mime_type(data)
+    try:
+        image = Image.open(io.BytesIO(data))
+        # Décodage complet ici : un fichier tronqué échoue maintenant plutôt qu'au réencodage
+        image.load()
+        # EXIF (dont la position GPS), XMP ou commentaire à ne pas transmettre à Gemini
+        has_metadata = bool(image.getexif()) or any(
+            key in image.info for key in ("exif", "xmp", "XML:com.adobe.xmp", "comment")
+        )
+        # Application de l'orientation EXIF avant de supprimer les métadonnées
+        image = ImageOps.exif_transpose(image)
+    except Exception:
+        # Une image illisible n'est jamais transmise telle quelle : ses
+        # métadonnées ne pourraient pas en être retirées
+        if mime_type in ("image/heic", "image/heif"):
+            raise ValueError("Format HEIC/HEIF non supporté par ce serveur, envoyez une image JPEG ou PNG")
+        raise ValueError("Image illisible ou format non supporté")
+
+    resized = max(image.size) > max_dimension
+    if resized:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        # Fond blanc sous les zones transparentes, souvent noires une fois l'alpha
+        # supprimé : un texte noir y deviendrait illisible pour l'OCR
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        background.alpha_composite(image)
+        image = background
+
+    image = image.convert("L" if grayscale else "RGB")
+
+    # L'image est réencodée en JPEG sans EXIF ; le nouvel encodage est retenu
+    # s'il est plus léger, si l'original porte des métadonnées ou si le format
+    # d'origine n'est pas accepté par Gemini
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    recompressed = output.getvalue()
+
+    if resized or grayscale or has_metadata or mime_type not in ("image/jpeg", "image/png", "image/webp") \
+            or len(recompressed) < len(data):
+        return PreparedImage(data=recompressed, mime_type="image/jpeg")
+    return PreparedImage(data=data, mime_type=mime_type)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def start_image_pool(settings: Settings) -> None:
+    """Créer le pool de processus dédié au prétraitement des images."""
+    global _pool
+    if _pool is None and settings.image_preprocessing_enabled:
+        # Pas de fork : le worker a déjà des threads (boucle, pool par défaut)
+        # et un fork pourrait hériter d'un verrou tenu par l'un d'eux
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.image_preprocess_workers,
+            mp_context=multiprocessing.get_context(method)
+        )
+
+def stop_image_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+async def prepare_images(images: List[bytes], settings: Settings) -> List[PreparedImage]:
+    """Préparer les images pour Gemini sans bloquer la boucle d'événements."""
+    if not settings.image_preprocessing_enabled:
+        prepared = []
+        for data in images:
+            mime_type = sniff_mime_type(data)
+            if mime_type is None:
+                raise ValueError("Format d'image non supporté")
+            prepared.append(PreparedImage(data=data, mime_type=mime_type))
+        return prepared
+
+    # Sans pool (hors lifespan), repli sur le pool de threads par défaut
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(*(
+        loop.run_in_executor(
+            _pool,
+            _preprocess_sync,
+            data,
+            settings.image_max_dimension,
+            settings.image_jpeg_quality,
+            settings.image_grayscale
+        )
+        for data in images
+    )))
\ No newline at end of file
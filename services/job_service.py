@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+from config import Settings
+from models.flashcard import FlashcardCreate, Language
+from models.job import JobStage, JobStatus
+from services.flashcard_service import create_flashcards_batch
+from services.gemini_service import extract_text_from_images, generate_flashcards_from_text
+from services.job_store import JobStore, create_job_store
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value)
+
+class JobQueueFull(Exception):
+    """La file d'attente des jobs a atteint sa capacité maximale."""
+
+class JobRunner:
+    """Pool borné de workers asyncio exécutant les jobs de génération du processus."""
+
+    def __init__(self, store: JobStore, workers: int, queue_size: int, poll_interval: float):
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Places réservées par submit() pendant l'enregistrement du job
+        self._reserved = 0
+        self._running: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._changed = asyncio.Condition()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Jobs en cours ou en attente abandonnés : marqués en échec pour que le
+        # long-poll se termine, y compris après un redémarrage (stockage SQLite)
+        abandoned = list(self._running)
+        self._running.clear()
+        while not self._queue.empty():
+            job_id, *_ = self._queue.get_nowait()
+            abandoned.append(job_id)
+        for job_id in abandoned:
+            try:
+                await self._update(
+                    job_id,
+                    status=JobStatus.FAILED.value,
+                    error="Génération interrompue par l'arrêt du serveur, relancez-la"
+                )
+            except Exception as e:
+                logger.warning("Impossible de marquer le job %s en échec: %s", job_id, e)
+
+    async def submit(
+            self,
+            user_id: str,
+            images: List[bytes],
+            count: int,
+            language: Language,
+            course_name: Optional[str] = None,
+            tags: List[str] = []
+    ) -> Dict[str, Any]:
+        """Enregistrer un job et le placer en file d'attente sans attendre son exécution."""
+        # Place réservée avant l'enregistrement : la file ne peut plus se remplir
+        # pendant l'attente de store.create
+        if self._queue.qsize() + self._reserved >= self.queue_size:
+            raise JobQueueFull("Trop de générations en attente, réessayez plus tard")
+        self._reserved += 1
+
+        now = time.time()
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "status": JobStatus.PENDING.value,
+            "stage": JobStage.QUEUED.value,
+            "progress": 0.0,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        try:
+            await self.store.create(job)
+        finally:
+            self._reserved -= 1
+        self._queue.put_nowait((job["id"], user_id, images, count, language, course_name, tags))
+        return job
+
+    async def get(self, job_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """Lire un job, en attendant jusqu'à wait secondes qu'il se termine (long-poll)."""
+        deadline = time.monotonic() + wait
+        while True:
+            job = await self.store.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in TERMINAL_STATUSES or remaining <= 0:
+                return job
+
+            # Réveil immédiat pour les jobs de ce processus, relecture périodique
+            # pour ceux exécutés par un autre worker (stockage SQLite partagé)
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _update(self, job_id: str, **fields: Any) -> None:
+        await self.store.update(job_id, updated_at=time.time(), **fields)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _work(self) -> None:
+        while True:
+            job_id, *params = await self._queue.get()
+            self._running.add(job_id)
+            try:
+                await self._run(job_id, *params)
+            except Exception as e:
+                logger.warning("Échec du job de génération %s: %s", job_id, e)
+                await self._update(job_id, status=JobStatus.FAILED.value, error=str(e))
+            finally:
+                self._queue.task_done()
+            # Non atteint si le worker est annulé : stop() marque alors le job en échec
+            self._running.discard(job_id)
+
+    async def _run(
+            self,
+            job_id: str,
+            user_id: str,
+            images: List[bytes],
+            count: int,
+            language: Language,
+            course_name: Optional[str],
+            tags: List[str]
+    ) -> None:
+        await self._update(job_id, status=JobStatus.RUNNING.value, stage=JobStage.OCR.value, progress=0.1)
+        extracted_text = await extract_text_from_images(images)
+
+        await self._update(job_id, stage=JobStage.GENERATION.value, progress=0.4)
+        flashcards_data = await generate_flashcards_from_text(extracted_text, count, language)
+        flashcards = [
+            FlashcardCreate(
+                question=fc_data["question"],
+                answer=fc_data["answer"],
+                course_name=course_name,
+                tags=tags,
+                language=language
+            )
+            for fc_data in flashcards_data
+        ]
+
+        await self._update(job_id, stage=JobStage.INSERT.value, progress=0.8)
+        supabase = await get_supabase_client()
+        created_cards = await create_flashcards_batch(flashcards, user_id, supabase)
+
+        await self._update(
+            job_id,
+            status=JobStatus.SUCCEEDED.value,
+            stage=JobStage.DONE.value,
+            progress=1.0,
+            result={
+                "flashcards": [card.model_dump(mode="json") for card in created_cards],
+                "count": len(created_cards),
+            }
+        )
+
+_runner: Optional[JobRunner] = None
+
+async def start_job_runner(settings: Settings) -> None:
+    """Démarrer le pool de workers de génération du processus."""
+    global _runner
+    if _runner is not None:
+        return
+    _runner = JobRunner(
+        create_job_store(settings),
+        workers=settings.job_workers,
+        queue_size=settings.job_queue_size,
+        poll_interval=settings.job_poll_interval
+    )
+    _runner.start()
+
+async def stop_job_runner() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.stop()
+    _runner = None
+
+def get_job_runner() -> JobRunner:
+    """Dépendance FastAPI renvoyant le pool de workers démarré par le lifespan."""
+    if _runner is None:
+        raise RuntimeError("Le pool de jobs de génération n'est pas démarré")
+    return _runner
\ No newline at end of file
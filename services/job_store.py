@@ -0,0 +1,113 @@
+import abc
+import asyncio
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+from config import Settings
+
+# Colonnes d'un job ; "result" est sérialisé en JSON par le backend SQLite
+JOB_FIELDS = ("id", "user_id", "status", "stage", "progress", "result", "error", "created_at", "updated_at")
+
+class JobStore(abc.ABC):
+    """Interface commune des stockages de jobs de génération."""
+
+    @abc.abstractmethod
+    async def create(self, job: Dict[str, Any]) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abc.abstractmethod
+    async def update(self, job_id: str, **fields: Any) -> None:
+        ...
+
+class MemoryJobStore(JobStore):
+    """Stockage propre au processus ; les jobs terminés expirent après ttl secondes."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    async def create(self, job: Dict[str, Any]) -> None:
+        self._purge()
+        self._jobs[job["id"]] = dict(job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        if job_id in self._jobs:
+            self._jobs[job_id].update(fields)
+
+    def _purge(self) -> None:
+        limit = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job["updated_at"] < limit]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+class SQLiteJobStore(JobStore):
+    """Stockage sur disque, lisible par tous les workers uvicorn d'une même machine."""
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, status TEXT NOT NULL, "
+                "stage TEXT NOT NULL, progress REAL NOT NULL, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def _create_sync(self, job: Dict[str, Any]) -> None:
+        row = {**job, "result": json.dumps(job.get("result"))}
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE updated_at < ?", (time.time() - self.ttl,))
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' * len(JOB_FIELDS))})",
+                tuple(row.get(field) for field in JOB_FIELDS)
+            )
+
+    def _get_sync(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(zip(JOB_FIELDS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _update_sync(self, job_id: str, fields: Dict[str, Any]) -> None:
+        if "result" in fields:
+            fields = {**fields, "result": json.dumps(fields["result"])}
+        columns = [field for field in fields if field in JOB_FIELDS and field != "id"]
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                (*(fields[column] for column in columns), job_id)
+            )
+
+    async def create(self, job: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._create_sync, job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get_sync, job_id)
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        await asyncio.to_thread(self._update_sync, job_id, fields)
+
+def create_job_store(settings: Settings) -> JobStore:
+    if settings.job_store_backend == "sqlite":
+        return SQLiteJobStore(settings.job_store_path, settings.job_ttl)
+    return MemoryJobStore(settings.job_ttl)
\ No newline at end of file
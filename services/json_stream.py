@@ -0,0 +1,62 @@
+import json
+from typing import Any, List
+
+class JSONArrayStreamParser:
+    """Analyseur incrémental des objets d'un tableau JSON reçu par morceaux.
+
+    Chaque appel à feed() renvoie les objets du tableau de premier niveau qui
+    sont devenus complets, sans attendre la fin du tableau. Le texte qui
+    précède le premier '[' (préambule, balises markdown) est ignoré.
+    """
+
+    def __init__(self):
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer: List[str] = []
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, text: str) -> List[Any]:
+        objects = []
+        for char in text:
+            if self._finished:
+                break
+
+            if not self._in_array:
+                if char == "[":
+                    self._in_array = True
+                continue
+
+            if self._depth == 0:
+                # Entre deux éléments : seuls le début d'un objet et la fin du tableau comptent
+                if char == "{":
+                    self._depth = 1
+                    self._buffer = [char]
+                elif char == "]":
+                    self._finished = True
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    objects.append(json.loads("".join(self._buffer)))
+                    self._buffer = []
+
+        return objects
\ No newline at end of file
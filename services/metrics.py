@@ -0,0 +1,110 @@
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+import httpx
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest
+)
+
+REQUEST_LATENCY = Histogram(
+    "cardify_http_request_duration_seconds",
+    "Durée des requêtes HTTP par route",
+    ["method", "route", "status"]
+)
+STAGE_LATENCY = Histogram(
+    "cardify_stage_duration_seconds",
+    "Durée des étapes internes (décodage, OCR, génération, analyse, insertion...)",
+    ["stage"]
+)
+UPSTREAM_CALLS = Counter(
+    "cardify_upstream_calls_total",
+    "Appels aux services externes",
+    ["service", "operation"]
+)
+UPSTREAM_ERRORS = Counter(
+    "cardify_upstream_errors_total",
+    "Appels en erreur aux services externes",
+    ["service", "operation"]
+)
+CACHE_LOOKUPS = Counter(
+    "cardify_cache_lookups_total",
+    "Consultations des caches, par résultat",
+    ["cache", "result"]
+)
+ADMISSION_REJECTIONS = Counter(
+    "cardify_admission_rejections_total",
+    "Demandes refusées sans appel au service externe, par motif",
+    ["service", "reason"]
+)
+
+# Étapes mesurées pendant la requête courante, pour l'en-tête Server-Timing
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+def start_request_spans() -> List[Tuple[str, float]]:
+    spans: List[Tuple[str, float]] = []
+    _request_spans.set(spans)
+    return spans
+
+@contextmanager
+def span(stage: str):
+    """Mesurer une étape : histogramme Prometheus et entrée Server-Timing de la requête."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage=stage).observe(duration)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((stage, duration))
+
+@asynccontextmanager
+async def track_call(service: str, operation: str):
+    """Compter un appel à un service externe et ses erreurs, en mesurant sa durée."""
+    UPSTREAM_CALLS.labels(service=service, operation=operation).inc()
+    try:
+        with span(f"{service}_{operation}"):
+            yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(service=service, operation=operation).inc()
+        raise
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+def record_rejection(service: str, reason: str) -> None:
+    ADMISSION_REJECTIONS.labels(service=service, reason=reason).inc()
+
+def _supabase_operation(request: httpx.Request) -> str:
+    # /rest/v1/flashcards -> rest_flashcards, /auth/v1/user -> auth_user
+    parts = [part for part in request.url.path.split("/") if part and part != "v1"]
+    return "_".join(parts[:2]) or "root"
+
+async def _on_supabase_request(request: httpx.Request) -> None:
+    UPSTREAM_CALLS.labels(service="supabase", operation=_supabase_operation(request)).inc()
+
+async def _on_supabase_response(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        UPSTREAM_ERRORS.labels(service="supabase", operation=_supabase_operation(response.request)).inc()
+
+# Crochets httpx installés sur le pool partagé : chaque appel Supabase est compté
+SUPABASE_EVENT_HOOKS = {
+    "request": [_on_supabase_request],
+    "response": [_on_supabase_response],
+}
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposer les métriques au format Prometheus, agrégées entre workers si configuré."""
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
\ No newline at end of file
@@ -0,0 +1,155 @@
+import abc
+import asyncio
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from config import Settings
+from services.metrics import record_cache_lookup
+
+def image_cache_key(images: List[bytes]) -> str:
+    """Clé de cache déterminée uniquement par le contenu décodé des images."""
+    digest = hashlib.sha256()
+    for image in images:
+        digest.update(hashlib.sha256(image).digest())
+    return digest.hexdigest()
+
+class OCRCache(abc.ABC):
+    """Interface commune des caches de texte extrait, avec compteurs de succès/échecs."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        text = await self._get(key)
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        record_cache_lookup("ocr", text is not None)
+        return text
+
+    async def set(self, key: str, text: str) -> None:
+        await self._set(key, text)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    @abc.abstractmethod
+    async def _get(self, key: str) -> Optional[str]:
+        ...
+
+    @abc.abstractmethod
+    async def _set(self, key: str, text: str) -> None:
+        ...
+
+class MemoryOCRCache(OCRCache):
+    """Cache LRU propre au processus, borné par la taille totale des textes stockés."""
+
+    def __init__(self, ttl: float, max_bytes: int):
+        super().__init__(ttl)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        text, size, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._evict(key)
+            return None
+
+        self._data.move_to_end(key)
+        return text
+
+    async def _set(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        if key in self._data:
+            self._evict(key)
+        self._data[key] = (text, size, time.monotonic() + self.ttl)
+        self.size += size
+
+        while self.size > self.max_bytes:
+            self._evict(next(iter(self._data)))
+
+    def _evict(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self.size -= size
+
+    def stats(self) -> Dict[str, int]:
+        return {**super().stats(), "entries": len(self._data), "bytes": self.size}
+
+class SQLiteOCRCache(OCRCache):
+    """Cache sur disque partagé par tous les workers uvicorn d'une même machine."""
+
+    def __init__(self, ttl: float, path: str, max_entries: int):
+        super().__init__(ttl)
+        self.path = path
+        self.max_entries = max_entries
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ocr_cache_created_at ON ocr_cache (created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def _get_sync(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT text FROM ocr_cache WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_sync(self, key: str, text: str) -> None:
+        self._writes += 1
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, text, created_at) VALUES (?, ?, ?)",
+                (key, text, time.time())
+            )
+            if self._writes % 100:
+                return
+            # Purge périodique des entrées expirées puis des plus anciennes au-delà de la limite
+            conn.execute("DELETE FROM ocr_cache WHERE created_at <= ?", (time.time() - self.ttl,))
+            conn.execute(
+                "DELETE FROM ocr_cache WHERE key IN ("
+                "SELECT key FROM ocr_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    async def _get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get_sync, key)
+
+    async def _set(self, key: str, text: str) -> None:
+        await asyncio.to_thread(self._set_sync, key, text)
+
+_ocr_cache: Optional[OCRCache] = None
+
+def get_ocr_cache(settings: Settings) -> Optional[OCRCache]:
+    """Renvoyer le cache OCR configuré pour ce worker, ou None s'il est désactivé."""
+    global _ocr_cache
+    if _ocr_cache is None:
+        if settings.ocr_cache_backend == "memory":
+            _ocr_cache = MemoryOCRCache(settings.ocr_cache_ttl, settings.ocr_cache_max_bytes)
+        elif settings.ocr_cache_backend == "sqlite":
+            _ocr_cache = SQLiteOCRCache(
+                settings.ocr_cache_ttl,
+                settings.ocr_cache_path,
+                settings.ocr_cache_max_entries
+            )
+    return _ocr_cache
\ No newline at end of file
@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List
+from supabase import AsyncClient
+from models.flashcard import FlashcardResponse
+from models.review import DueFlashcard, ReviewBatchResult, ReviewGrade, ReviewState
+from services.flashcard_service import FLASHCARD_COLUMNS
+
+async def get_due_flashcards(user_id: str, supabase: AsyncClient, limit: int = 20) -> List[DueFlashcard]:
+    """Récupérer les prochaines flashcards à réviser, dans l'ordre de leur échéance."""
+    result = await (
+        supabase.table("flashcard_reviews")
+        .select(f"*, flashcards!inner({FLASHCARD_COLUMNS})")
+        .eq("user_id", user_id)
+        .lte("due_at", datetime.now(timezone.utc).isoformat())
+        .is_("flashcards.deleted_at", "null")
+        .order("due_at")
+        .limit(limit)
+        .execute()
+    )
+
+    due_cards = []
+    for row in result.data:
+        card = row.pop("flashcards")
+        due_cards.append(DueFlashcard(flashcard=FlashcardResponse(**card), review=ReviewState(**row)))
+    return due_cards
+
+async def apply_reviews(user_id: str, grades: List[ReviewGrade], supabase: AsyncClient) -> ReviewBatchResult:
+    """Appliquer un lot de notes de révision en une requête, de façon atomique.
+
+    Le calcul SM-2 est fait par la fonction apply_flashcard_reviews : les notes
+    déjà appliquées sont ignorées, un lot renvoyé par le client est donc sans effet.
+    """
+    # Identifiants normalisés : un identifiant invalide ferait échouer tout le lot
+    flashcard_ids: Dict[str, str] = {}
+    not_found = []
+    for grade in grades:
+        try:
+            flashcard_ids.setdefault(grade.flashcard_id, str(uuid.UUID(grade.flashcard_id)))
+        except ValueError:
+            if grade.flashcard_id not in not_found:
+                not_found.append(grade.flashcard_id)
+
+    reviews = [
+        {**grade.model_dump(mode="json"), "flashcard_id": flashcard_ids[grade.flashcard_id]}
+        for grade in grades
+        if grade.flashcard_id in flashcard_ids
+    ]
+    states = {}
+    if reviews:
+        result = await supabase.rpc("apply_flashcard_reviews", {
+            "p_user_id": user_id,
+            "p_reviews": reviews,
+        }).execute()
+        states = {row["flashcard_id"]: ReviewState(**row) for row in result.data}
+
+    updated = []
+    for flashcard_id, canonical_id in flashcard_ids.items():
+        if canonical_id in states:
+            updated.append(states.pop(canonical_id))
+        else:
+            not_found.append(flashcard_id)
+
+    return ReviewBatchResult(reviews=updated, not_found=not_found)
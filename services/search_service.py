@@ -0,0 +1,21 @@
+from typing import List, Optional
+from supabase import AsyncClient
+from models.flashcard import FlashcardSearchResult, Language
+
+async def search_user_flashcards(
+        user_id: str,
+        query: str,
+        supabase: AsyncClient,
+        language: Optional[Language] = None,
+        limit: int = 20,
+        offset: int = 0
+) -> List[FlashcardSearchResult]:
+    """Recherche classée via la fonction Postgres search_flashcards (tsvector + index GIN)."""
+    result = await supabase.rpc("search_flashcards", {
+        "p_user_id": user_id,
+        "p_query": query,
+        "p_language": language.value if language else None,
+        "p_limit": limit,
+        "p_offset": offset,
+    }).execute()
+    return [FlashcardSearchResult(**card) for card in result.data]
@@ -0,0 +1,48 @@
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# orjson est facultatif : sans lui, repli sur le module json de la bibliothèque standard
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # Le mode Python évite une conversion intermédiaire : dates et enums
+        # sont écrits directement par le sérialiseur
+        return obj.model_dump()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Type non sérialisable en JSON: {type(obj).__name__}")
+
+def dumps(content: Any, sort_keys: bool = False) -> bytes:
+    """Sérialiser en JSON (UTF-8) des données pouvant contenir des modèles Pydantic."""
+    if orjson is not None:
+        option = orjson.OPT_UTC_Z | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(content, default=_default, option=option)
+
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        sort_keys=sort_keys,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON sérialisée par orjson, qui accepte directement des modèles Pydantic.
+
+    Renvoyée telle quelle par un endpoint, elle court-circuite la validation et
+    la sérialisation de response_model : à réserver aux données déjà validées,
+    comme les flashcards construites à partir des lignes de la base.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,34 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """Partage une même exécution entre les appels concurrents ayant la même clé.
+
+    Le premier appel lance la coroutine ; les suivants, tant qu'elle n'est pas
+    terminée, attendent son résultat (ou son exception) au lieu de la relancer.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # L'annulation d'un appelant ne doit pas interrompre l'exécution partagée
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Marque l'exception comme lue si tous les appelants sont partis
+        if not task.cancelled():
+            task.exception()
\ No newline at end of file
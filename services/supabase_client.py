@@ -0,0 +1,61 @@
+from typing import Optional
+import httpx
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
+from config import Settings, get_settings
+from services.metrics import SUPABASE_EVENT_HOOKS
+
+# Clients partagés par toutes les requêtes du worker, créés par le lifespan
+_http_client: Optional[httpx.AsyncClient] = None
+_client: Optional[AsyncClient] = None
+_auth_client: Optional[AsyncClient] = None
+
+async def _build_client(settings: Settings, http_client: httpx.AsyncClient) -> AsyncClient:
+    options = AsyncClientOptions(
+        httpx_client=http_client,
+        postgrest_client_timeout=settings.supabase_timeout,
+        auto_refresh_token=False,
+        persist_session=False,
+    )
+    return await acreate_client(settings.supabase_url, settings.supabase_key, options=options)
+
+async def init_supabase_clients(settings: Settings) -> None:
+    """Créer les clients Supabase du worker et leur pool de connexions keep-alive."""
+    global _http_client, _client, _auth_client
+    if _client is not None:
+        return
+
+    _http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.supabase_pool_max_connections,
+            max_keepalive_connections=settings.supabase_pool_max_keepalive,
+            keepalive_expiry=settings.supabase_pool_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(settings.supabase_timeout),
+        event_hooks=SUPABASE_EVENT_HOOKS,
+    )
+    _client = await _build_client(settings, _http_client)
+    # Les connexions (sign_in, sign_up) modifient la session du client qui les
+    # exécute : on les isole dans un second client pour ne jamais envoyer le
+    # jeton d'un utilisateur avec les requêtes PostgREST.
+    _auth_client = await _build_client(settings, _http_client)
+
+async def close_supabase_clients() -> None:
+    """Fermer le pool de connexions à l'arrêt du worker."""
+    global _http_client, _client, _auth_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _client = None
+    _auth_client = None
+
+async def get_supabase_client() -> AsyncClient:
+    """Dépendance FastAPI renvoyant le client Supabase partagé pour les données."""
+    if _client is None:
+        await init_supabase_clients(get_settings())
+    return _client
+
+async def get_supabase_auth_client() -> AsyncClient:
+    """Dépendance FastAPI renvoyant le client Supabase partagé pour l'authentification."""
+    if _auth_client is None:
+        await init_supabase_clients(get_settings())
+    return _auth_client
\ No newline at end of file
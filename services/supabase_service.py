@@ -1,17 +1,10 @@
-from supabase import create_client, Client
-from config import get_settings
+from supabase import AsyncClient
 from typing import Dict, Any, Optional
 from fastapi import HTTPException, status
 
-settings = get_settings()
-
-def get_supabase_client() -> Client:
-    return create_client(settings.supabase_url, settings.supabase_key)
-
-async def sign_up_user(email: str, password: str) -> Dict[str, Any]:
-    client = get_supabase_client()
+async def sign_up_user(email: str, password: str, client: AsyncClient) -> Dict[str, Any]:
     try:
-        result = client.auth.sign_up({
+        result = await client.auth.sign_up({
             "email": email,
             "password": password
         })
@@ -22,10 +15,9 @@ async def sign_up_user(email: str, password: str) -> Dict[str, Any]:
             detail=f"Erreur d'inscription: {str(e)}"
         )
     
-async def sign_in_user(email: str, password: str) -> Dict[str, Any]:
-    client = get_supabase_client()
+async def sign_in_user(email: str, password: str, client: AsyncClient) -> Dict[str, Any]:
     try:
-        result = client.auth.sign_in_with_password({
+        result = await client.auth.sign_in_with_password({
             "email": email,
             "password": password
         })
@@ -36,10 +28,9 @@ async def sign_in_user(email: str, password: str) -> Dict[str, Any]:
             detail="Identifiants invalides"
         )
     
-async def sign_in_with_google(token: str) -> Dict[str, Any]:
-    client = get_supabase_client()
+async def sign_in_with_google(token: str, client: AsyncClient) -> Dict[str, Any]:
     try:
-        result = client.auth.sign_in_with_oauth({
+        result = await client.auth.sign_in_with_oauth({
             "provider": "google",
             "access_token": token
         })
@@ -50,10 +41,9 @@ async def sign_in_with_google(token: str) -> Dict[str, Any]:
             detail="Token Google invalide"
         )
     
-async def get_user(token: str) -> Optional[Dict[str, Any]]:
-    client = get_supabase_client()
+async def get_user(token: str, client: AsyncClient) -> Optional[Dict[str, Any]]:
     try:
-        user = client.auth.get_user(token)
+        user = await client.auth.get_user(token)
         return user
     except Exception:
         return None
\ No newline at end of file
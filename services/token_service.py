@@ -0,0 +1,83 @@
+import asyncio
+import time
+from typing import Optional
+import jwt
+from config import Settings
+from models.user import AuthenticatedUser
+from services.cache import TTLCache
+
+class LocalVerificationUnavailable(Exception):
+    """Le jeton ne peut pas être vérifié localement (clé inconnue, JWKS injoignable...)."""
+
+_token_cache: Optional[TTLCache] = None
+_jwks_client: Optional[jwt.PyJWKClient] = None
+
+def get_token_cache(settings: Settings) -> TTLCache:
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TTLCache(maxsize=settings.auth_cache_size, ttl=settings.auth_cache_ttl)
+    return _token_cache
+
+def _get_jwks_client(settings: Settings) -> Optional[jwt.PyJWKClient]:
+    global _jwks_client
+    if _jwks_client is None and settings.supabase_jwks_url:
+        _jwks_client = jwt.PyJWKClient(settings.supabase_jwks_url, cache_keys=True)
+    return _jwks_client
+
+def can_verify_locally(settings: Settings) -> bool:
+    return bool(settings.supabase_jwt_secret or settings.supabase_jwks_url)
+
+async def _get_signing_key(token: str, settings: Settings):
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+
+    if algorithm == "HS256" and settings.supabase_jwt_secret:
+        return settings.supabase_jwt_secret, algorithm
+
+    jwks_client = _get_jwks_client(settings)
+    if jwks_client is None or algorithm not in ("RS256", "ES256"):
+        raise LocalVerificationUnavailable(f"Algorithme non vérifiable localement: {algorithm}")
+
+    try:
+        # PyJWKClient est synchrone mais ne touche le réseau que lorsque la
+        # clé n'est pas encore en cache
+        signing_key = await asyncio.to_thread(jwks_client.get_signing_key_from_jwt, token)
+    except jwt.PyJWKClientError as e:
+        raise LocalVerificationUnavailable(str(e))
+    return signing_key.key, algorithm
+
+async def verify_token_locally(token: str, settings: Settings) -> Optional[AuthenticatedUser]:
+    """Vérifier la signature, l'expiration et l'audience d'un jeton d'accès Supabase.
+
+    Renvoie None si le jeton est invalide et lève LocalVerificationUnavailable
+    s'il ne peut pas être vérifié sans appeler Supabase Auth.
+    """
+    try:
+        key, algorithm = await _get_signing_key(token, settings)
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=settings.supabase_jwt_audience,
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.InvalidTokenError:
+        return None
+
+    return AuthenticatedUser(
+        id=claims["sub"],
+        email=claims.get("email"),
+        role=claims.get("role"),
+    )
+
+def token_ttl(token: str) -> Optional[float]:
+    """Durée de validité restante du jeton, lue sans vérifier la signature."""
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return None
+
+    exp = claims.get("exp")
+    if exp is None:
+        return None
+    return exp - time.time()
\ No newline at end of file
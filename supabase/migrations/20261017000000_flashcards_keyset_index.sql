@@ -0,0 +1,4 @@
+-- Index couvrant la pagination par curseur de GET /flashcards :
+-- WHERE user_id = ? ORDER BY created_at DESC, id DESC
+create index if not exists flashcards_user_created_at_id_idx
+    on public.flashcards (user_id, created_at desc, id desc);
@@ -0,0 +1,29 @@
+-- Synchronisation différentielle : date de modification et suppression logique
+alter table public.flashcards
+    add column if not exists updated_at timestamptz not null default now(),
+    add column if not exists deleted_at timestamptz;
+
+create or replace function public.flashcards_set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists flashcards_set_updated_at on public.flashcards;
+create trigger flashcards_set_updated_at
+    before update on public.flashcards
+    for each row execute function public.flashcards_set_updated_at();
+
+-- Lecture des modifications : WHERE user_id = ? ORDER BY updated_at, id
+create index if not exists flashcards_user_updated_at_id_idx
+    on public.flashcards (user_id, updated_at, id);
+
+-- Les listes ne portent que sur les flashcards non supprimées
+drop index if exists public.flashcards_user_created_at_id_idx;
+create index if not exists flashcards_user_created_at_id_idx
+    on public.flashcards (user_id, created_at desc, id desc)
+    where deleted_at is null;
@@ -0,0 +1,80 @@
+-- Recherche plein texte classée sur les questions et réponses des flashcards
+
+alter table public.flashcards
+    add column if not exists language text;
+
+-- Configuration de recherche Postgres associée à chaque valeur de l'enum Language ;
+-- le vietnamien et le thaï n'ont pas de configuration dédiée
+create or replace function public.flashcards_search_config(p_language text)
+returns regconfig
+language sql
+immutable
+as $$
+    select case p_language
+        when 'fr' then 'french'::regconfig
+        when 'en' then 'english'::regconfig
+        when 'es' then 'spanish'::regconfig
+        when 'de' then 'german'::regconfig
+        when 'it' then 'italian'::regconfig
+        else 'simple'::regconfig
+    end
+$$;
+
+alter table public.flashcards
+    add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector(public.flashcards_search_config(language), coalesce(question, '')), 'A') ||
+        setweight(to_tsvector(public.flashcards_search_config(language), coalesce(answer, '')), 'B')
+    ) stored;
+
+create index if not exists flashcards_search_vector_idx
+    on public.flashcards using gin (search_vector);
+
+-- Sans langue précisée, la requête est analysée dans toutes les configurations
+-- et les variantes sont combinées en OU : la tsquery reste constante et l'index
+-- GIN reste utilisable quelle que soit la langue de chaque flashcard.
+create or replace function public.search_flashcards(
+    p_user_id uuid,
+    p_query text,
+    p_language text default null,
+    p_limit integer default 20,
+    p_offset integer default 0
+)
+returns table (
+    id uuid,
+    user_id uuid,
+    question text,
+    answer text,
+    course_name text,
+    tags text[],
+    language text,
+    created_at timestamptz,
+    updated_at timestamptz,
+    rank real
+)
+language sql
+stable
+as $$
+    with q as (
+        select case
+            when p_language is not null then
+                websearch_to_tsquery(public.flashcards_search_config(p_language), p_query)
+            else
+                websearch_to_tsquery('french', p_query) ||
+                websearch_to_tsquery('english', p_query) ||
+                websearch_to_tsquery('spanish', p_query) ||
+                websearch_to_tsquery('german', p_query) ||
+                websearch_to_tsquery('italian', p_query) ||
+                websearch_to_tsquery('simple', p_query)
+        end as query
+    )
+    select f.id, f.user_id, f.question, f.answer, f.course_name, f.tags, f.language,
+           f.created_at, f.updated_at, ts_rank_cd(f.search_vector, q.query) as rank
+    from public.flashcards f, q
+    where f.user_id = p_user_id
+      and f.deleted_at is null
+      and f.search_vector @@ q.query
+    order by rank desc, f.created_at desc
+    limit p_limit
+    offset p_offset
+$$;
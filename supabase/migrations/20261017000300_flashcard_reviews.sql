@@ -0,0 +1,37 @@
+-- État de révision espacée (SM-2) de chaque flashcard
+create table if not exists public.flashcard_reviews (
+    flashcard_id uuid primary key references public.flashcards (id) on delete cascade,
+    user_id uuid not null,
+    due_at timestamptz not null default now(),
+    interval_days real not null default 0,
+    ease real not null default 2.5,
+    repetitions integer not null default 0,
+    lapses integer not null default 0,
+    last_reviewed_at timestamptz
+);
+
+-- File des cartes à réviser : WHERE user_id = ? AND due_at <= now() ORDER BY due_at
+create index if not exists flashcard_reviews_user_due_at_idx
+    on public.flashcard_reviews (user_id, due_at);
+
+-- Toute nouvelle flashcard est immédiatement à réviser
+create or replace function public.flashcards_create_review()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.flashcard_reviews (flashcard_id, user_id)
+    values (new.id, new.user_id)
+    on conflict (flashcard_id) do nothing;
+    return new;
+end;
+$$;
+
+drop trigger if exists flashcards_create_review on public.flashcards;
+create trigger flashcards_create_review
+    after insert on public.flashcards
+    for each row execute function public.flashcards_create_review();
+
+insert into public.flashcard_reviews (flashcard_id, user_id)
+select id, user_id from public.flashcards
+on conflict (flashcard_id) do nothing;
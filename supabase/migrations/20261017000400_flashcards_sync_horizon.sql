@@ -0,0 +1,80 @@
+-- Synchronisation différentielle sans modification manquée.
+--
+-- updated_at vaut now(), l'heure de début de la transaction : une transaction
+-- commencée plus tôt mais validée plus tard obtient une date inférieure à un
+-- jeton déjà distribué et ne serait jamais transmise. Les modifications sont
+-- donc ordonnées par identifiant de transaction (xid8) et seules celles des
+-- transactions antérieures à l'horizon de visibilité sont renvoyées : toute
+-- transaction d'identifiant inférieur à pg_snapshot_xmin est terminée, aucune
+-- ligne ne peut plus apparaître derrière le jeton.
+
+alter table public.flashcards
+    add column if not exists change_xid xid8 not null default pg_current_xact_id();
+
+create or replace function public.flashcards_set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    new.change_xid := pg_current_xact_id();
+    return new;
+end;
+$$;
+
+-- Lecture des modifications : WHERE user_id = ? ORDER BY change_xid, id
+create index if not exists flashcards_user_change_xid_id_idx
+    on public.flashcards (user_id, change_xid, id);
+
+drop index if exists public.flashcards_user_updated_at_id_idx;
+
+create or replace function public.flashcard_changes(
+    p_user_id uuid,
+    p_after_xid xid8 default '0',
+    p_after_id uuid default '00000000-0000-0000-0000-000000000000',
+    p_limit integer default 500
+)
+returns setof public.flashcards
+language sql
+stable
+as $$
+    select f.*
+    from public.flashcards f
+    where f.user_id = p_user_id
+      and f.change_xid < pg_snapshot_xmin(pg_current_snapshot())
+      and (f.change_xid, f.id) > (p_after_xid, p_after_id)
+    order by f.change_xid, f.id
+    limit p_limit
+$$;
+
+-- Purge des pierres tombales : au-delà de la rétention (sync_tombstone_retention_days
+-- côté API), les jetons plus anciens sont refusés et le client resynchronise tout.
+create or replace function public.purge_flashcard_tombstones(p_retention interval default interval '30 days')
+returns bigint
+language sql
+as $$
+    with purged as (
+        delete from public.flashcards
+        where deleted_at is not null
+          and deleted_at < now() - p_retention
+        returning 1
+    )
+    select count(*) from purged
+$$;
+
+create index if not exists flashcards_deleted_at_idx
+    on public.flashcards (deleted_at)
+    where deleted_at is not null;
+
+-- Purge quotidienne si pg_cron est disponible
+do $$
+begin
+    if exists (select 1 from pg_extension where extname = 'pg_cron') then
+        perform cron.schedule(
+            'purge-flashcard-tombstones',
+            '17 3 * * *',
+            'select public.purge_flashcard_tombstones()'
+        );
+    end if;
+end;
+$$;
@@ -0,0 +1,26 @@
+-- Les suppressions de flashcards sont logiques (deleted_at) : "on delete cascade"
+-- ne s'applique qu'à la purge des pierres tombales. L'état de révision est donc
+-- supprimé dès que la flashcard est marquée supprimée, pour que la file des
+-- cartes à réviser ne contienne que des cartes vivantes.
+create or replace function public.flashcards_delete_review()
+returns trigger
+language plpgsql
+as $$
+begin
+    delete from public.flashcard_reviews where flashcard_id = new.id;
+    return new;
+end;
+$$;
+
+drop trigger if exists flashcards_delete_review on public.flashcards;
+create trigger flashcards_delete_review
+    after update of deleted_at on public.flashcards
+    for each row
+    when (old.deleted_at is null and new.deleted_at is not null)
+    execute function public.flashcards_delete_review();
+
+-- États orphelins laissés par les suppressions antérieures
+delete from public.flashcard_reviews r
+using public.flashcards f
+where f.id = r.flashcard_id
+  and f.deleted_at is not null;
@@ -0,0 +1,5 @@
+-- flashcard_reviews est une table publique : sans RLS, PostgREST exposerait
+-- l'état de révision de tous les utilisateurs à quiconque détient la clé anon.
+-- Aucune politique n'est définie : seule l'API, qui utilise la clé service_role
+-- (exemptée de RLS), y accède.
+alter table public.flashcard_reviews enable row level security;
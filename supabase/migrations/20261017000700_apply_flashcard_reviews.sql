@@ -0,0 +1,77 @@
+-- Application d'un lot de notes de révision (SM-2) en une seule transaction.
+--
+-- Lire les états puis les réécrire depuis l'API laissait deux lots concurrents
+-- s'écraser, et un lot renvoyé par le client était appliqué deux fois. Ici les
+-- cartes du lot sont verrouillées, et une note dont reviewed_at n'est pas
+-- postérieure à last_reviewed_at est ignorée : rejouer un lot ne change rien.
+-- Renvoie l'état courant de chaque carte du lot appartenant à l'utilisateur.
+create or replace function public.apply_flashcard_reviews(p_user_id uuid, p_reviews jsonb)
+returns setof public.flashcard_reviews
+language plpgsql
+as $$
+declare
+    g record;
+    r public.flashcard_reviews;
+begin
+    -- Verrouillage dans un ordre fixe pour éviter les interblocages entre lots
+    perform 1
+    from public.flashcard_reviews
+    where user_id = p_user_id
+      and flashcard_id in (select (e ->> 'flashcard_id')::uuid from jsonb_array_elements(p_reviews) e)
+    order by flashcard_id
+    for update;
+
+    -- Plusieurs notes pour une même carte s'appliquent dans l'ordre chronologique
+    for g in
+        select (t.e ->> 'flashcard_id')::uuid as flashcard_id,
+               (t.e ->> 'grade')::integer as grade,
+               coalesce((t.e ->> 'reviewed_at')::timestamptz, now()) as reviewed_at
+        from jsonb_array_elements(p_reviews) with ordinality as t(e, n)
+        order by 3, t.n
+    loop
+        select * into r
+        from public.flashcard_reviews
+        where flashcard_id = g.flashcard_id
+          and user_id = p_user_id;
+
+        if not found or g.reviewed_at <= r.last_reviewed_at then
+            continue;
+        end if;
+
+        if g.grade < 3 then
+            -- Échec : la carte repart du début de son apprentissage
+            r.interval_days := 1;
+            r.repetitions := 0;
+            r.lapses := r.lapses + 1;
+        else
+            r.interval_days := case r.repetitions
+                when 0 then 1
+                when 1 then 6
+                else round(r.interval_days * r.ease)
+            end;
+            r.repetitions := r.repetitions + 1;
+        end if;
+        r.ease := greatest(1.3, r.ease + 0.1 - (5 - g.grade) * (0.08 + (5 - g.grade) * 0.02));
+        r.due_at := g.reviewed_at + r.interval_days * interval '1 day';
+        r.last_reviewed_at := g.reviewed_at;
+
+        update public.flashcard_reviews
+        set due_at = r.due_at,
+            interval_days = r.interval_days,
+            ease = r.ease,
+            repetitions = r.repetitions,
+            lapses = r.lapses,
+            last_reviewed_at = r.last_reviewed_at
+        where flashcard_id = r.flashcard_id;
+    end loop;
+
+    return query
+        select *
+        from public.flashcard_reviews
+        where user_id = p_user_id
+          and flashcard_id in (select (e ->> 'flashcard_id')::uuid from jsonb_array_elements(p_reviews) e);
+end;
+$$;
+
+-- Réservée à l'API : p_user_id n'est pas contrôlé par la fonction
+revoke execute on function public.apply_flashcard_reviews(uuid, jsonb) from public, anon, authenticated;
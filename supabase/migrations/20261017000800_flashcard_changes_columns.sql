@@ -0,0 +1,36 @@
+-- flashcard_changes renvoyait des lignes complètes (setof public.flashcards),
+-- search_vector compris : seules les colonnes utiles à la synchronisation sont
+-- désormais renvoyées. Le type de retour change, la fonction est recréée.
+drop function if exists public.flashcard_changes(uuid, xid8, uuid, integer);
+
+create function public.flashcard_changes(
+    p_user_id uuid,
+    p_after_xid xid8 default '0',
+    p_after_id uuid default '00000000-0000-0000-0000-000000000000',
+    p_limit integer default 500
+)
+returns table (
+    id uuid,
+    user_id uuid,
+    question text,
+    answer text,
+    course_name text,
+    tags text[],
+    language text,
+    created_at timestamptz,
+    updated_at timestamptz,
+    deleted_at timestamptz,
+    change_xid xid8
+)
+language sql
+stable
+as $$
+    select f.id, f.user_id, f.question, f.answer, f.course_name, f.tags, f.language,
+           f.created_at, f.updated_at, f.deleted_at, f.change_xid
+    from public.flashcards f
+    where f.user_id = p_user_id
+      and f.change_xid < pg_snapshot_xmin(pg_current_snapshot())
+      and (f.change_xid, f.id) > (p_after_xid, p_after_id)
+    order by f.change_xid, f.id
+    limit p_limit
+$$;
@@ -0,0 +1,11 @@
+-- Les fonctions du schéma public reçoivent par défaut le droit EXECUTE pour
+-- PUBLIC (et pour anon/authenticated sous Supabase) : PostgREST les expose donc
+-- en RPC à quiconque détient la clé anon. Celles-ci font confiance à leur
+-- paramètre p_user_id ou suppriment des données (la purge avec interval '0'
+-- effacerait les pierres tombales avant leur synchronisation) : elles sont
+-- réservées à l'API, qui les appelle avec la clé service_role (dont le droit,
+-- accordé explicitement par Supabase, est conservé).
+revoke execute on function public.purge_flashcard_tombstones(interval) from public, anon, authenticated;
+revoke execute on function public.flashcard_changes(uuid, xid8, uuid, integer) from public, anon, authenticated;
+revoke execute on function public.search_flashcards(uuid, text, text, integer, integer) from public, anon, authenticated;
+